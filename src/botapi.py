@@ -18,21 +18,37 @@
 
 import json
 import os
+import time
 
 import requests
 
 from src import logger
+from src.config import load_config
+from src.polls import Poll, PollStore
+from src.retry import CircuitBreaker, DEFAULT_POLICY, POLICIES
+from src.updates import Update, loads, parse_updates
+
+# Connection pool shared by all bots in process
+session = requests.Session()
+
+# All bots talk to the same api, so they stop and resume sending requests together
+breaker = CircuitBreaker()
 
 
 class TelegramBotException(Exception):
     pass
 
 
+class TelegramUnavailableException(TelegramBotException):
+    """Api is not available now and request was not sent"""
+
+    def __init__(self, msg: str, retry_after: float = 0):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
 def import_config(debug: bool = False):
-    config_filename = 'config.json' if not debug else 'devconfig.json'
-    logger.logger.debug('Using ' + config_filename + ' as config file')
-    with open(config_filename, 'r') as f:
-        return json.loads(f.read())
+    return load_config(debug)
 
 
 class TelegramBotAPI:
@@ -40,128 +56,189 @@ class TelegramBotAPI:
     token: str
     url: str
     offset: int = 0
+    committed_offset: int = 0
 
-    command_listeners = {}
-    callback_query_listeners = {}
+    command_listeners: dict
+    callback_query_listeners: dict
 
-    chats = []
+    chats: list
 
-    polls: dict
+    polls: PollStore
     _POLLS_FILENAME: str = 'polls.json'
     _CHATS_FILENAME: str = 'chats.json'
+    _OFFSET_FILENAME: str = 'offset.json'
 
-    def __init__(self, token: str, debug: bool):
+    def __init__(self, token: str, debug: bool, config: dict = None, data_dir: str = '', session_: requests.Session = None):
         """
         Create instance of TelegramBotAPI
 
         Params:
         token: str - your's bot token. You can get it from @BotFather in Telegram
+        config: dict - already loaded config. If None config will be loaded from file
+        data_dir: str - folder for polls, chats and offset files of this bot. Every bot in process needs its own one
+        session_: requests.Session - HTTP connection pool. Shared module session is used by default
         """
         logger.logger.debug('Running __init__ of TelegramBotAPI, token="' + token + '"')
 
-        self.config = import_config(debug)
+        self.config = config if config is not None else import_config(debug)
 
         self.token = token
+        self._bot_id = None
         self.url = 'https://api.telegram.org/bot' + token
-        self.polls = self._load_polls()
+        self.data_dir = data_dir
+        self.session = session_ if session_ is not None else session
+        self.breaker = breaker
+        self.sleep = time.sleep
+
+        self.command_listeners = {}
+        self.callback_query_listeners = {}
+
+        self.polls = PollStore(self._data_path(self._POLLS_FILENAME), self.config.get('finished_poll_retention', 3600))
+        self.polls.load()
         self.chats = self._load_chats()
+        self.offset = self.committed_offset = self._load_offset()
 
-    def start_poll(self, chat_id: int, question: str, answers: list) -> dict:
-        logger.logger.info('Starting poll (' + question + ') -> [' + ', '.join(answers) + ']; in chat #' + str(chat_id))
-        response = requests.get('{}/sendPoll?chat_id={}&question={}&options={}'.format(
-            self.url,
-            str(chat_id),
-            question,
-            '["' + '","'.join(answers) + '"]'))
+    def _data_path(self, filename: str) -> str:
+        return os.path.join(self.data_dir, filename)
+
+    def _call(self, method: str, params: dict = None) -> dict:
+        """
+        Call method of bot api and return its response. Raises TelegramBotException if api returned error
+
+        Network errors, 429 and 5xx responses are retried according to retry policy of method. If api is failing
+        circuit breaker stops sending requests and TelegramUnavailableException is raised
+        """
 
-        logger.logger.debug('Got poll creation response. Status code: ' + str(response.status_code))
+        policy = POLICIES.get(method, DEFAULT_POLICY)
+        attempt = 0
 
-        response = response.json()
+        while True:
+            if not self.breaker.allow_request():
+                raise TelegramUnavailableException('Api is unavailable, ' + method + ' was not sent', self.breaker.time_until_retry())
 
-        if not response['ok']:
-            logger.logger.error('Got error from api! ' + response['description'])
-            raise TelegramBotException(response['description'])
+            retry_after = 0
+            try:
+                response = self.session.get('{}/{}'.format(self.url, method), params=params, timeout=policy.timeout)
+            except requests.exceptions.ConnectTimeout as e:
+                error, safe = e, True
+            except requests.RequestException as e:
+                # Request could reach Telegram before connection was lost or response was broken
+                error, safe = e, False
+            else:
+                logger.logger.trace('Got ' + method + ' response. Status code: ' + str(response.status_code))
+
+                if response.status_code == 429:
+                    # Too many requests, Telegram did not process this one
+                    error, safe = TelegramBotException('Too many requests'), True
+                    try:
+                        retry_after = loads(response.content).get('parameters', {}).get('retry_after', 0)
+                    except ValueError:
+                        retry_after = 0
+                elif response.status_code >= 500:
+                    error, safe = TelegramBotException('Server error ' + str(response.status_code)), False
+                else:
+                    self.breaker.record_success()
+
+                    response = loads(response.content)
+
+                    if not response['ok']:
+                        logger.logger.error('Got error from api! ' + response['description'])
+                        raise TelegramBotException(response['description'])
+
+                    return response
+
+            self.breaker.record_failure()
+            attempt += 1
+
+            if not policy.can_retry(attempt, safe):
+                logger.logger.error('Request ' + method + ' failed after ' + str(attempt) + ' attempts: ' + str(error))
+                raise TelegramBotException(method + ' failed: ' + str(error)) from error
+
+            delay = max(retry_after, policy.delay(attempt - 1))
+            logger.logger.warning('Request ' + method + ' failed (' + str(error) + '), retrying in ' + '{:.1f}'.format(delay) + ' seconds')
+            self.sleep(delay)
+
+    def start_poll(self, chat_id: int, question: str, answers: list) -> dict:
+        logger.logger.info('Starting poll (' + question + ') -> [' + ', '.join(answers) + ']; in chat #' + str(chat_id))
+        response = self._call('sendPoll', {'chat_id': chat_id, 'question': question, 'options': json.dumps(answers)})
 
         poll_id = int(response['result']['poll']['id'])
         logger.logger.debug('Successfully created poll with id: ' + str(poll_id))
-        empty_poll_options = response['result']['poll']['options']
-        self.polls[poll_id] = empty_poll_options
+        self.polls.add(Poll(poll_id, chat_id, response['result']['date'], len(answers)))
 
         return response
 
     def send_message(self, chat_id: int, msg: str) -> dict:
         logger.logger.debug('Sending message "' + msg + '" to chat #' + str(chat_id))
-        response = requests.get('{}/sendMessage?chat_id={}&text={}'.format(self.url, str(chat_id), msg))
+        response = self._call('sendMessage', {'chat_id': chat_id, 'text': msg})
 
-        logger.logger.debug('Got sending message response. Status code: ' + str(response.status_code))
+        logger.logger.debug('Successfully sent message')
 
-        response = response.json()
+        return response
 
-        if not response['ok']:
-            logger.logger.error('Got error from api! ' + response['description'])
-            raise TelegramBotException(response['description'])
+    def get_new_updates(self, limit: int = 100) -> list:
+        """
+        Get updates after current offset, run listeners for them and return them as list of Update
 
-        logger.logger.debug('Successfully sent message')
+        Offset is moved forward only in memory. Call commit_offset() after returned updates are processed
+        """
 
-        return response
+        updates = self.fetch_updates(limit)
+        self.dispatch_updates(updates)
 
-    def get_new_updates(self) -> dict:
-        logger.logger.trace('Getting new updates!')
-        response = requests.get('{}/getUpdates?offset={}'.format(self.url, str(self.offset)))
+        return updates
 
-        logger.logger.trace('Got updates response. Status code: ' + str(response.status_code))
+    def fetch_updates(self, limit: int = 100) -> list:
+        """Get updates after current offset without running listeners. Offset is moved forward only in memory"""
 
-        response = response.json()
+        logger.logger.trace('Getting new updates!')
+        updates = parse_updates(self._call('getUpdates', {'offset': self.offset, 'limit': limit, 'allowed_updates': json.dumps(Update.ALLOWED)})['result'])
 
-        if len(response['result']) > 0:
-            self.offset = response['result'][-1]['update_id'] + 1
+        if len(updates) > 0:
+            self.offset = updates[-1].update_id + 1
             logger.logger.trace('Updated offset to ' + str(self.offset))
 
-        if not response['ok']:
-            logger.logger.error('Got error from api! ' + response['description'])
-            raise TelegramBotException(response['description'])
+        return updates
 
-        self._update_polls(response['result'])
-        self._check_for_commands(response['result'])
-        self._check_for_inline(response['result'])
-        self._check_for_new_chats(response['result'])
+    def dispatch_updates(self, updates: list) -> None:
+        """Update polls and chats and run command and callback query listeners"""
 
-        return response
+        self._update_polls(updates)
+        self._check_for_commands(updates)
+        self._check_for_inline(updates)
+        self._check_for_new_chats(updates)
 
     def kick_chat_member(self, chat_id: int, user_id: int, until_date: int = 0) -> dict:
         logger.logger.info('Kicking user with id ' + str(user_id) + ' until ' + str(until_date) + ' (in seconds), chat #' + str(chat_id))
-        response = requests.get('{}/kickChatMember?chat_id={}&user_id={}&until_date={}'.format(
-            self.url,
-            str(chat_id),
-            str(user_id),
-            str(until_date)))
+        return self._call('kickChatMember', {'chat_id': chat_id, 'user_id': user_id, 'until_date': until_date})
 
-        logger.logger.debug('Got kicking response. Status code: ' + str(response.status_code))
+    def get_chat_administrators(self, chat_id: int) -> list:
+        """Return ChatMember objects of all administrators of chat"""
 
-        response = response.json()
+        logger.logger.debug('Getting administrators of chat #' + str(chat_id))
+        return self._call('getChatAdministrators', {'chat_id': chat_id})['result']
 
-        if not response['ok']:
-            logger.logger.error('Got error from api! ' + response['description'])
-            raise TelegramBotException(response['description'])
+    @property
+    def bot_id(self) -> int:
+        """Id of bot. It's the first part of token, api is asked only if token has other format"""
 
-        return response
+        if self._bot_id is None:
+            prefix = self.token.split(':')[0]
+            self._bot_id = int(prefix) if prefix.isdigit() else self._call('getMe')['result']['id']
+        return self._bot_id
 
-    def _get_new_updates_without_offset(self) -> dict:
-        logger.logger.trace('Getting new updates w/o offset!')
-        response = requests.get('{}/getUpdates'.format(self.url))
+    def get_chat_members_count(self, chat_id: int) -> int:
+        logger.logger.debug('Getting members count of chat #' + str(chat_id))
+        return self._call('getChatMembersCount', {'chat_id': chat_id})['result']
 
-        logger.logger.trace('Got updates response. Status code: ' + str(response.status_code))
-
-        response = response.json()
-
-        self._check_for_commands(response['result'])
-        self._check_for_inline(response['result'])
+    def _get_new_updates_without_offset(self) -> list:
+        logger.logger.trace('Getting new updates w/o offset!')
+        updates = parse_updates(self._call('getUpdates')['result'])
 
-        if not response['ok']:
-            logger.logger.error('Got error from api! ' + response['description'])
-            raise TelegramBotException(response['description'])
+        self._check_for_commands(updates)
+        self._check_for_inline(updates)
 
-        return response
+        return updates
 
     def send_error_message(self, chat_id: int, e: Exception) -> dict:
         logger.logger.warning('Sending error message to chat #' + str(chat_id) + ' for Exception: ' + str(e))
@@ -181,54 +258,24 @@ class TelegramBotAPI:
 
         logger.logger.info('Sending message with inline reply markup to chat #' + str(chat_id) + ', msg = "' + msg)
 
-        url_ = '{}/sendMessage?chat_id={}&text={}&reply_markup={}"inline_keyboard":[['.format(self.url, str(chat_id), msg, '{')
-
-        for option in options:
-            url_ = url_ + '{' + '"text": "{}", "callback_data": "{}"'.format(option[0], option[1]) + '}, '
-
-        url_ = url_[:-2] + ']]}'
-
-        response = requests.get(url_)
-
-        logger.logger.info('Got sendMessage with inline reply markup response. Status code: ' + str(response.status_code))
-
-        response = response.json()
-
-        if not response['ok']:
-            logger.logger.error('Got error from api! ' + response['description'])
-            raise TelegramBotException(response['description'])
+        keyboard = [[{'text': option[0], 'callback_data': option[1]} for option in options]]
+        response = self._call('sendMessage', {'chat_id': chat_id, 'text': msg, 'reply_markup': json.dumps({'inline_keyboard': keyboard})})
 
         msg_id = response['result']['message_id']
 
         self.callback_query_listeners[msg_id] = listener
 
-    @staticmethod
-    def _load_polls() -> dict:
-        """Load information about all polls from file"""
-
-        logger.logger.info('Loading polls from ' + TelegramBotAPI._POLLS_FILENAME)
-
-        if os.path.exists(TelegramBotAPI._POLLS_FILENAME):
-            with open(TelegramBotAPI._POLLS_FILENAME, 'r') as f:
-                return json.loads(f.read())
-        else:
-            logger.logger.info('Polls file does not exist. Returning empty dict')
-            return dict()
-
     def save_polls(self) -> None:
-        """Saves information about polls to file"""
-
-        logger.logger.trace('Saving polls to file')
+        """Saves information about open polls to file"""
 
-        with open(TelegramBotAPI._POLLS_FILENAME, 'w') as f:
-            f.write(json.dumps(self.polls))
+        self.polls.save()
 
-    def get_poll_result(self, poll_id: int) -> dict:
+    def get_poll_result(self, poll_id: int) -> Poll:
         logger.logger.trace('Getting results of poll with id ' + str(poll_id))
-        self._update_polls(self._get_new_updates_without_offset()['result'])
+        self._update_polls(self._get_new_updates_without_offset())
 
         logger.logger.trace('Done getting results')
-        return self.polls[poll_id]
+        return self.polls.get(poll_id)
 
     def _update_polls(self, updates: list) -> None:
         """Update options of every poll that was updated"""
@@ -236,11 +283,9 @@ class TelegramBotAPI:
         logger.logger.trace('Updating polls')
 
         for update in updates:
-            if 'poll' in update.keys():
-                poll_id = int(update['poll']['id'])
-                poll_options = update['poll']['options']
-                self.polls[poll_id] = poll_options
-                logger.logger.trace('Updated poll with id ' + str(poll_id))
+            if update.poll is not None:
+                self.polls.update_votes(update.poll.id, update.poll.options)
+                logger.logger.trace('Updated poll with id ' + str(update.poll.id))
 
     def _check_for_commands(self, updates: list) -> None:
         """Checking if messages contain message with command. If yes will launch command listener"""
@@ -248,14 +293,19 @@ class TelegramBotAPI:
         logger.logger.trace('Checking for commands')
 
         for update in updates:
-            try:
-                if update['message']['text'].startswith('/') and (self.config['bot_username'] in update['message']['text'] or update['message']['chat']['type'] == 'private'):
-                    command = update['message']['text'].replace('@', ' ').split()[0][1:]
+            message = update.message
+            if message is None or message.from_user is None or not message.text.startswith('/'):
+                continue
+
+            if self.config['bot_username'] in message.text or message.chat.type == 'private':
+                words = message.text.replace('@', ' ').split()
+                command = words[0][1:]
+                args = words[1:]
+                if args and '@' + args[0] == self.config['bot_username']:
+                    args = args[1:]
 
-                    if command in self.command_listeners.keys():
-                        self.command_listeners[command](update['message']['chat']['id'], update['message']['from']['id'])
-            except (NameError, IndexError, KeyError) as e:
-                logger.logger.trace('Ignored name exception in checking report command: ' + str(e))
+                if command in self.command_listeners.keys():
+                    self.command_listeners[command](message.chat.id, message.from_user.id, args)
 
     def _check_for_inline(self, updates: list):
         """Checking updates for callback_query"""
@@ -263,33 +313,64 @@ class TelegramBotAPI:
         logger.logger.trace('Checking for callback_query')
 
         for update in updates:
-            try:
-                if 'callback_query' in update.keys():
-                    msg_id = update['callback_query']['message']['message_id']
-                    if msg_id in self.callback_query_listeners.keys():
-                        self.callback_query_listeners[msg_id](update['callback_query']['message']['chat']['id'], update['callback_query']['data'])
-            except (NameError, IndexError, KeyError) as e:
-                logger.logger.trace('Ignored name exception in checking callback_query command: ' + str(e))
+            query = update.callback_query
+            if query is None or query.message is None:
+                continue
+
+            if query.message.message_id in self.callback_query_listeners.keys():
+                self.callback_query_listeners[query.message.message_id](query.message.chat.id, query.data)
+
+    def commit_offset(self, offset: int = None) -> None:
+        """
+        Save offset to file, so updates before it will not be processed again after restart
+
+        Current offset is saved if offset is None. Pass smaller one if some fetched updates are not processed yet
+        """
+
+        offset = self.offset if offset is None else offset
+        if offset == self.committed_offset:
+            return
+
+        logger.logger.trace('Committing offset ' + str(offset))
+
+        offset_filename = self._data_path(self._OFFSET_FILENAME)
+        with open(offset_filename + '.tmp', 'w') as f:
+            f.write(json.dumps({'offset': offset}))
+        os.replace(offset_filename + '.tmp', offset_filename)
+
+        self.committed_offset = offset
+
+    def _load_offset(self) -> int:
+        offset_filename = self._data_path(self._OFFSET_FILENAME)
+        if not os.path.isfile(offset_filename):
+            logger.logger.info('Offset file does not exist. Starting from offset 0')
+            return 0
+
+        with open(offset_filename, 'r') as f:
+            offset = json.loads(f.read())['offset']
+
+        logger.logger.info('Loaded offset ' + str(offset))
+        return offset
 
     def _load_chats(self) -> list:
-        chats_full_path = os.path.join(os.path.dirname(__file__), '..\\' + self._CHATS_FILENAME)
+        chats_full_path = self._data_path(self._CHATS_FILENAME)
 
         if os.path.isfile(chats_full_path):
             with open(chats_full_path, 'r') as f:
                 return json.loads(f.read())
 
-    def _save_chats(self):
-        chats_full_path = os.path.join(os.path.dirname(__file__), '..\\' + self._CHATS_FILENAME)
+        return []
 
-        with open(chats_full_path, 'w') as f:
+    def _save_chats(self):
+        with open(self._data_path(self._CHATS_FILENAME), 'w') as f:
             f.write(json.dumps(self.chats))
 
     def _check_for_new_chats(self, updates: list):
+        changed = False
         for update in updates:
-            try:
-                chat_id = update['message']['chat']['id']
-                if chat_id not in self.chats:
-                    self.chats += [chat_id]
-            except (NameError, IndexError, KeyError) as e:
-                logger.logger.trace('Ignored name exception in for new chats: ' + str(e))
-        self._save_chats()
+            if update.message is not None and update.message.chat.id not in self.chats:
+                self.chats += [update.message.chat.id]
+                changed = True
+
+        if changed:
+            self._save_chats()
@@ -0,0 +1,85 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import time
+
+from src import logger
+
+
+class ChatInfoCache:
+    """
+    Cache of chat administrators, their rights and members count
+
+    Every value lives for ttl seconds. Values of chat are also dropped when updates show that its members changed, so
+    bot asks api about every chat at most once per ttl
+    """
+
+    def __init__(self, api, ttl: float = 600, clock=time.monotonic):
+        self.api = api
+        self.ttl = ttl
+        self.clock = clock
+        self._admins = {}
+        self._members_count = {}
+
+    def _get_admins(self, chat_id: int) -> tuple:
+        """(expiry time, ids of administrators, ids of administrators that can ban users)"""
+
+        cached = self._admins.get(chat_id)
+        if cached is None or cached[0] <= self.clock():
+            members = self.api.get_chat_administrators(chat_id)
+            cached = (self.clock() + self.ttl,
+                      frozenset(member['user']['id'] for member in members),
+                      frozenset(member['user']['id'] for member in members
+                                if member.get('status') == 'creator' or member.get('can_restrict_members')))
+            self._admins[chat_id] = cached
+        return cached
+
+    def get_administrators(self, chat_id: int) -> frozenset:
+        """Ids of chat administrators"""
+
+        return self._get_admins(chat_id)[1]
+
+    def can_ban(self, chat_id: int, user_id: int) -> bool:
+        """True if user is administrator of chat that can ban members"""
+
+        return user_id in self._get_admins(chat_id)[2]
+
+    def get_members_count(self, chat_id: int) -> int:
+        cached = self._members_count.get(chat_id)
+        if cached is None or cached[0] <= self.clock():
+            cached = (self.clock() + self.ttl, self.api.get_chat_members_count(chat_id))
+            self._members_count[chat_id] = cached
+        return cached[1]
+
+    def invalidate(self, chat_id: int) -> None:
+        self._admins.pop(chat_id, None)
+        self._members_count.pop(chat_id, None)
+
+    def process_updates(self, updates: list) -> None:
+        """Drop cached values of chats whose members or their statuses were changed"""
+
+        for update in updates:
+            if update.chat_member is not None:
+                chat_id = update.chat_member.chat.id
+            elif update.message is not None and update.message.changes_members:
+                chat_id = update.message.chat.id
+            else:
+                continue
+
+            logger.logger.trace('Chat members changed, invalidating cache of chat #' + str(chat_id))
+            self.invalidate(chat_id)
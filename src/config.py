@@ -0,0 +1,37 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import json
+
+from src import logger
+
+config: dict = {}
+
+
+def load_config(debug: bool = False) -> dict:
+    """Parse config file once and return the same shared dict on every next call"""
+
+    if config:
+        return config
+
+    config_filename = 'config.json' if not debug else 'devconfig.json'
+    logger.logger.debug('Using ' + config_filename + ' as config file')
+    with open(config_filename, 'r') as f:
+        config.update(json.loads(f.read()))
+
+    return config
@@ -0,0 +1,58 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import time
+
+
+class Cooldowns:
+    """Keys that are on cooldown now. Every key is removed when its cooldown ends"""
+
+    def __init__(self, duration: float, clock=time.time):
+        self.duration = duration
+        self.clock = clock
+        self._until = {}
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def start(self, key) -> None:
+        if self.duration > 0:
+            # Key is moved to the end, so keys are ordered by end of cooldown
+            self._until.pop(key, None)
+            self._until[key] = self.clock() + self.duration
+
+    def is_active(self, key) -> bool:
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= self.clock():
+            del self._until[key]
+            return False
+        return True
+
+    def purge(self) -> None:
+        """Remove all ended cooldowns"""
+
+        now = self.clock()
+        ended = []
+        for key, until in self._until.items():
+            if until > now:
+                break
+            ended.append(key)
+        for key in ended:
+            del self._until[key]
@@ -16,180 +16,459 @@
 #
 #    Copyright (c) 2019 Nikita Serba
 
-import json
+import math
+import os
 import time
 
+import requests
+
 from src import logger
 from src.syslang import langapi
-from src.botapi import TelegramBotAPI
+from src.syssettings import settingsapi
+from src.botapi import TelegramBotAPI, TelegramBotException, TelegramUnavailableException
+from src.chatcache import ChatInfoCache
+from src.clock import system_clock
+from src.cooldowns import Cooldowns
+from src.history import CLOSED, FAILED, KICKED, VoteHistory
+from src.ingest import BOOKKEEPING, COMMANDS, INTERACTIVE, UpdateQueue
+from src.polls import Poll
+from src.profiler import profiler
 from src.sysbugs.bugtrackerapi import report_custom_message
 
-polls: dict = {}
-config: dict = {}
-api: TelegramBotAPI
-
-
-def init_bot(debug: bool = False):
-    global api, config
-    logger.logger.info('Begging init of bot')
-
-    logger.logger.debug('Loading config file (debug = ' + 'True)' if debug else 'False)')
-    config = load_config(debug)
-    logger.logger.debug('Crating instance of TelegramBotAPI in bot init')
-    api = TelegramBotAPI(config['token'], debug)
-    logger.logger.debug('Adding report command listener')
-    api.add_command_listener('report', report_command_processor)
-    logger.logger.debug('Adding lang command listener')
-    api.add_command_listener('lang', send_lang_inline)
-
-
-def load_config(debug: bool = False) -> dict:
-    config_filename = 'config.json' if not debug else 'devconfig.json'
-    logger.logger.debug('Using ' + config_filename + ' as config file')
-    with open(config_filename, 'r') as f:
-        return json.loads(f.read())
 
+class DemoBot:
+    """One vote kick bot. All state of bot is kept in instance, so several bots can work in one process"""
+
+    def __init__(self, config: dict, debug: bool = False, session: requests.Session = None, clock=system_clock):
+        logger.logger.info('Begging init of bot ' + config['bot_username'])
+
+        self.config = config
+        self.name = config['bot_username']
+        self.clock = clock
+
+        data_dir = config.get('data_dir', '')
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+
+        logger.logger.debug('Crating instance of TelegramBotAPI in bot init')
+        self.api = TelegramBotAPI(config['token'], debug, config, data_dir, session)
+        self.settings = settingsapi.ChatSettingsStore(os.path.join(data_dir, settingsapi.CHAT_SETTINGS_FILE))
+        self.history = VoteHistory(os.path.join(data_dir, 'history'))
+        self.history.load()
+        self.queue = UpdateQueue(config.get('queue_capacity', 1000), config.get('bookkeeping_queue_capacity', 200))
+        self.chat_info = ChatInfoCache(self.api, config.get('chat_info_ttl', 600), clock.monotonic)
+        # (chat_id, user_id) of users that can not be voted against again yet
+        self.target_cooldowns = Cooldowns(config.get('target_cooldown', 3600), clock.time)
+        # (chat_id, user_id) of users that can not start new poll yet
+        self.initiator_cooldowns = Cooldowns(config.get('initiator_cooldown', 60), clock.time)
+        langapi.load_chat_langs(self.settings)
+
+        # Users that are writing bug report now, (chat_id, user_id) -> list of their answers.
+        # None means that /report command was received, but its message was not reached in updates yet
+        self.reports = {}
+        # (chat_id, user_id) of users whose /report command is queued, but not processed yet. Their next messages are
+        # answers, so they must not be shed
+        self.queued_reports = set()
+
+        logger.logger.debug('Adding report command listener')
+        self.api.add_command_listener('report', self.report_command_processor)
+        logger.logger.debug('Adding lang command listener')
+        self.api.add_command_listener('lang', self.send_lang_inline)
+        logger.logger.debug('Adding settings command listeners')
+        self.api.add_command_listener('settings', self.send_settings)
+        self.api.add_command_listener('set', self.change_setting)
+        self.api.add_command_listener('stats', self.send_stats)
+
+    def check_return_poll_candidates(self, updates: list) -> list:
+        logger.logger.trace('Checking poll candidates')
+
+        candidates = []
+        max_age = self.config.get('mention_max_age', 3600)
+        now = self.clock.time()
+
+        logger.logger.trace('Got ' + str(len(updates)) + ' updates')
+
+        for update in updates:
+            message = update.message
+            if message is None or self.name not in message.text:
+                continue
+
+            reply = message.reply_to_message
+            logger.logger.trace('Checking new mention! (is reply? ' + str(reply is not None) + ')\n' + str(update.raw))
+            if reply is None or reply.from_user is None:
+                continue
+
+            if now - message.date > max_age:
+                logger.logger.debug('Skipping mention older than ' + str(max_age) + ' seconds in chat #' + str(message.chat.id))
+                continue
+
+            result = dict()
+            result['chat_id'] = reply.chat.id
+            result['name'] = reply.from_user.full_name
+            result['user_id'] = reply.from_user.id
+            result['username'] = reply.from_user.username
+            result['initiator_id'] = message.from_user.id if message.from_user is not None else 0
+
+            logger.logger.info('Found kick candidate in chat #' + str(result['chat_id']) + ', with name ' + result['name'] + '(' + str(result['user_id']) + ')')
+
+            candidates += [result]
+
+        logger.logger.trace('Returning ' + str(len(candidates)) + ' kick candidates')
+
+        return candidates
+
+    def start_poll(self, chat_id: int, name: str, user_id: int) -> None:
+        response = self.api.start_poll(chat_id, langapi.msg_kick(chat_id, self.settings).replace('%NAME%', name),
+                                       [langapi.msg_kick_yes(chat_id, self.settings), langapi.msg_kick_no(chat_id, self.settings)])
+
+        self.api.polls.set_target(int(response['result']['poll']['id']), user_id, name)
+
+    def is_duplicate(self, chat_id: int, user_id: int, initiator_id: int) -> bool:
+        """Check without api calls if poll about user is already running or user or initiator are on cooldown"""
+
+        if self.api.polls.find_by_target(chat_id, user_id) is not None:
+            logger.logger.debug('Ignoring kick of ' + str(user_id) + ' in chat #' + str(chat_id) + ': poll is already running')
+            return True
+        if self.target_cooldowns.is_active((chat_id, user_id)):
+            logger.logger.debug('Ignoring kick of ' + str(user_id) + ' in chat #' + str(chat_id) + ': target is on cooldown')
+            return True
+        if self.initiator_cooldowns.is_active((chat_id, initiator_id)):
+            logger.logger.debug('Ignoring kick of ' + str(user_id) + ' in chat #' + str(chat_id) + ': initiator is on cooldown')
+            return True
+        return False
+
+    def check_kick_candidates(self, limit: int = 100) -> int:
+        """
+        Fetch new updates to queue and process up to limit most important queued ones. Returns count of fetched updates
+
+        Updates are fetched ahead of processing while queue has free space, so backlog is reordered by lanes of queue
+        instead of waiting on Telegram side in order it came
+        """
+
+        fetched = self.fetch_updates(self.queue.capacity)
+        self.process_updates(limit)
+
+        return fetched
+
+    def classify(self, update) -> int:
+        """Choose queue lane of update"""
+
+        if update.callback_query is not None or update.poll is not None:
+            return INTERACTIVE
+        # Changes of members invalidate chat info cache, so they must not be shed
+        if update.chat_member is not None:
+            return COMMANDS
+
+        message = update.message
+        if message is None:
+            return BOOKKEEPING
+
+        key = (message.chat.id, message.from_user.id) if message.from_user is not None else None
+        if message.text.startswith('/') or self.name in message.text:
+            if key is not None and message.text.replace('@', ' ').split()[0] == '/report':
+                self.queued_reports.add(key)
+            return COMMANDS
+        if message.changes_members or key in self.reports or key in self.queued_reports:
+            return COMMANDS
+
+        return BOOKKEEPING
+
+    def fetch_updates(self, limit: int = 100) -> int:
+        """Put up to limit new updates to queue. Fetches nothing while queue is full. Returns count of fetched updates"""
+
+        fetched = 0
+
+        while fetched < limit:
+            # Telegram returns at most 100 updates at once
+            batch_size = min(100, limit - fetched, self.queue.free_space())
+            if batch_size == 0:
+                logger.logger.debug('Update queue of ' + self.name + ' is full, not fetching updates')
+                break
+
+            updates = self.api.fetch_updates(batch_size)
+            for update in updates:
+                self.queue.put(update, self.classify(update))
+            fetched += len(updates)
+
+            if len(updates) < batch_size:
+                break
+
+        return fetched
+
+    def process_updates(self, limit: int = 100) -> int:
+        """Process up to limit queued updates, most important first. Their offset is committed by save()"""
+
+        updates = self.queue.pop_batch(limit)
+        if updates:
+            self.handle_updates(updates)
+
+        return len(updates)
+
+    def handle_updates(self, updates: list) -> None:
+        self.api.dispatch_updates(updates)
+        self.chat_info.process_updates(updates)
+        candidates = self.check_return_poll_candidates(updates)
+        for candidate in candidates:
+            if self.is_duplicate(candidate['chat_id'], candidate['user_id'], candidate['initiator_id']):
+                continue
+            if self.can_be_kicked(candidate['chat_id'], candidate['user_id'], candidate['username']):
+                self.start_poll(candidate['chat_id'], candidate['name'], candidate['user_id'])
+                self.initiator_cooldowns.start((candidate['chat_id'], candidate['initiator_id']))
+        self.check_report_answers(updates)
+
+    def catch_up(self, should_stop=None) -> None:
+        """
+        Process all updates that came while bot was down with max batch size and log drain rate
+
+        should_stop is called after every batch, catch-up is interrupted when it returns True
+        """
+
+        logger.logger.info('Catching up updates of ' + self.name + ' from offset ' + str(self.api.offset))
+
+        started = time.time()
+        count = 0
+        batch_size = 100
+
+        while True:
+            batch = self.check_kick_candidates(batch_size)
+            count += batch
+            if batch == 0 and len(self.queue) == 0:
+                break
+            if should_stop is not None and should_stop():
+                logger.logger.info('Catch-up of ' + self.name + ' is interrupted')
+                break
+            logger.logger.debug('Caught up ' + str(count) + ' updates')
+
+        self.save()
+
+        duration = time.time() - started
+        rate = count / duration if duration > 0 else 0
+        logger.logger.info('Caught up ' + str(count) + ' updates in ' + '{:.2f}'.format(duration) + ' seconds (' + '{:.1f}'.format(rate) + ' updates/s)')
+
+    def can_be_kicked(self, chat_id: int, user_id: int, username: str) -> bool:
+        """Bot can not kick anyone in private chat, itself and chat administrators, and nobody if it has no ban rights"""
+
+        # Telegram usernames are case-insensitive
+        if chat_id > 0 or ('@' + (username or '')).lower() == self.name.lower():
+            logger.logger.debug('Ignoring kick of ' + str(user_id) + ' in chat #' + str(chat_id) + ': impossible kick')
+            return False
+        if user_id in self.chat_info.get_administrators(chat_id):
+            logger.logger.debug('Ignoring kick of ' + str(user_id) + ' in chat #' + str(chat_id) + ': user is admin')
+            return False
+        if not self.chat_info.can_ban(chat_id, self.api.bot_id):
+            logger.logger.debug('Ignoring kick of ' + str(user_id) + ' in chat #' + str(chat_id) + ': bot can not ban users')
+            return False
+        return True
+
+    def get_quorum(self, chat_id: int, settings: dict) -> int:
+        """Count of 'yes' votes needed to kick: the biggest of static quorum and percent of chat members"""
+
+        if not settings['quorum_percent']:
+            return settings['quorum']
 
-def check_return_poll_candidates() -> list:
-    global api
-
-    logger.logger.trace('Checking poll candidates')
-
-    updates = api.get_new_updates()['result']
-    candidates = []
-
-    logger.logger.trace('Got ' + str(len(updates)) + ' updates')
-
-    for update in updates:
         try:
-            logger.logger.trace('Checking new update! (is mention? ' + str(
-                config['bot_username'] in update['message']['text']) + '; is reply? ' + str(
-                'reply_to_message' in update['message'].keys()) + ')\n' + str(update))
-            if config['bot_username'] in update['message']['text'] and 'reply_to_message' in update['message'].keys():
-                result = dict()
-                result['chat_id'] = update['message']['reply_to_message']['chat']['id']
-                result['name'] = update['message']['reply_to_message']['from']['first_name'] + ' ' + update['message']['reply_to_message']['from']['last_name']
-                result['user_id'] = update['message']['reply_to_message']['from']['id']
-
-                logger.logger.info('Found kick candidate in chat #' + str(result['chat_id']) + ', with name ' + result['name'] + '(' + str(result['user_id']) + ')')
-
-                candidates += [result]
-        except (NameError, IndexError, KeyError) as e:
-            logger.logger.trace('Ignored name exception in checking poll candidates: ' + str(e))
-
-    logger.logger.trace('Returning ' + str(len(candidates)) + ' kick candidates')
-
-    return candidates
-
-
-def start_poll(chat_id: int, name: str, user_id: int) -> None:
-    global polls, api
-
-    response = api.start_poll(chat_id, langapi.msg_kick(chat_id).replace('%NAME%', name), [langapi.msg_kick_yes(chat_id), langapi.msg_kick_no(chat_id)])
-
-    poll_id = int(response['result']['poll']['id'])
-
-    poll_info = dict()
-    poll_info['chat_id'] = chat_id
-    poll_info['date'] = response['result']['date']
-    poll_info['user_id'] = user_id
-    poll_info['name'] = name
-
-    polls[poll_id] = poll_info
-
-
-def check_kick_candidates():
-    candidates = check_return_poll_candidates()
-    for candidate in candidates:
-        start_poll(candidate['chat_id'], candidate['name'], candidate['user_id'])
+            members_count = self.chat_info.get_members_count(chat_id)
+        except TelegramUnavailableException:
+            raise
+        except TelegramBotException as e:
+            # E.g. bot was removed from chat. Poll must still be closed, so static quorum is used
+            logger.logger.warning('Can not get members count of chat #' + str(chat_id) + ', using static quorum: ' + str(e))
+            return settings['quorum']
+        return max(settings['quorum'], math.ceil(members_count * settings['quorum_percent'] / 100))
 
+    def kick_candidate(self, poll: Poll) -> bool:
+        """Kick target of poll. Returns False if Telegram refused to kick, e.g. because bot has no rights"""
 
-def kick_candidate(poll_id: int):
-    global polls
+        logger.logger.info('Kicking ' + poll.name + '(' + str(poll.user_id) + ') in chat #' + str(poll.chat_id))
 
-    logger.logger.info('Kicking ' + polls[poll_id]['name'] + '(' + str(polls[poll_id]['user_id']) + ') in chat #' + str(polls[poll_id]['chat_id']))
-
-    api.send_message(polls[poll_id]['chat_id'],
-                     langapi.msg_kick_res(polls[poll_id]['chat_id']).replace('%NAME%', polls[poll_id]['name']))
-    logger.logger.debug('Kick message already sent')
-    api.kick_chat_member(polls[poll_id]['chat_id'], polls[poll_id]['user_id'])
-
-
-def check_old_polls():
-    global polls
-    remove = []
-
-    for poll_id in polls.keys():
-        logger.logger.trace('Checking poll with id ' + str(poll_id))
-        poll_options = api.get_poll_result(poll_id)
-        if (time.time() - polls[poll_id]['date']) >= 12 * 3600 and poll_options[0]['voter_count'] > poll_options[1]['voter_count']:
-            kick_candidate(poll_id)
-            remove += [poll_id]
-        elif (time.time() - polls[poll_id]['date']) >= 24 * 3600:
-            logger.logger.info('Closing poll with id ' + str(poll_id) + ' after 24 hours')
-            remove += [poll_id]
-
-    for i in remove:
-        del polls[i]
-
-
-def report_command_processor(chat_id: int, from_id: int):
-    logger.logger.info('Starting processor for report command')
-    api.get_new_updates()
-    api.send_message(chat_id, langapi.msg_descrb_problem(chat_id))
-
-    bug_report_msg = ''
-
-    while bug_report_msg == '':
-        updates_ = api.get_new_updates()['result']
-        for update_ in updates_:
-            try:
-                if update_['message']['chat']['id'] == chat_id and update_['message']['from']['id'] == from_id:
-                    bug_report_msg = update_['message']['text']
-                    break
-            except (NameError, IndexError, KeyError) as e:
-                logger.logger.trace('Ignored name exception in checking report command: ' + str(e))
-
-    logger.logger.debug('Asking for contact info')
-
-    api.get_new_updates()
-    api.send_message(chat_id, langapi.msg_give_contact_info(chat_id))
-
-    from_msg = ''
-
-    while from_msg == '':
-        updates_ = api.get_new_updates()['result']
-        for update_ in updates_:
+        try:
+            self.api.kick_chat_member(poll.chat_id, poll.user_id)
+        except TelegramUnavailableException:
+            raise
+        except TelegramBotException as e:
+            logger.logger.warning('Can not kick ' + str(poll.user_id) + ' in chat #' + str(poll.chat_id) + ': ' + str(e))
+            return False
+        return True
+
+    def check_old_polls(self):
+        """Kick or close expired polls. Vote counts are already updated from poll updates in get_new_updates"""
+
+        if self.api.breaker.time_until_retry() > 0:
+            logger.logger.debug('Api is unavailable, not checking polls')
+            return
+
+        now = self.clock.time()
+        polls = self.api.polls
+
+        poll = polls.next_due(now)
+        while poll is not None:
+            logger.logger.trace('Checking poll with id ' + str(poll.poll_id))
             try:
-                if update_['message']['chat']['id'] == chat_id and update_['message']['from']['id'] == from_id:
-                    from_msg = update_['message']['text']
-                    break
-            except (NameError, IndexError, KeyError) as e:
-                logger.logger.trace('Ignored name exception in checking report command: ' + str(e))
-
-    logger.logger.debug('Sending bug report')
+                settings = self.settings.get_all(poll.chat_id)
+                kick_date = poll.date + settings['kick_delay']
+                close_date = poll.date + settings['poll_lifetime']
+                if now >= kick_date and poll.yes > poll.no and poll.yes >= self.get_quorum(poll.chat_id, settings):
+                    # Poll is closed only after kick, so kick that was not sent is tried again
+                    if self.kick_candidate(poll):
+                        self.close_poll(poll, now, KICKED)
+                        self.api.send_message(poll.chat_id, langapi.msg_kick_res(poll.chat_id, self.settings).replace('%NAME%', poll.name))
+                    else:
+                        self.close_poll(poll, now, FAILED)
+                elif now >= close_date:
+                    logger.logger.info('Closing poll with id ' + str(poll.poll_id) + ' after ' + str(settings['poll_lifetime']) + ' seconds')
+                    self.close_poll(poll, now, CLOSED)
+                else:
+                    polls.schedule(poll.poll_id, self.next_check_date(now, kick_date, close_date, settings))
+            except TelegramUnavailableException:
+                # Request was not sent, so poll is checked again as soon as api is back
+                if poll.poll_id in polls:
+                    polls.schedule(poll.poll_id, 0)
+                raise
+            except Exception:
+                # Poll that keeps failing must not block other polls, so it is tried again later
+                if poll.poll_id in polls:
+                    polls.schedule(poll.poll_id, now + self.config.get('poll_retry_delay', 60))
+                raise
+            poll = polls.next_due(now)
+
+        polls.evict_finished(now)
+        self.target_cooldowns.purge()
+        self.initiator_cooldowns.purge()
+
+    def next_check_date(self, now: float, kick_date: float, close_date: float, settings: dict) -> float:
+        """
+        Time when running poll must be checked again. New votes and changes of settings schedule poll immediately, so
+        it is enough to wake up at its deadlines. Only members count, that percent quorum depends on, is not tracked
+        """
+
+        if now < kick_date:
+            return kick_date
+        if settings['quorum_percent']:
+            return min(close_date, now + self.config.get('chat_info_ttl', 600))
+        return close_date
+
+    def close_poll(self, poll: Poll, now: float, outcome: int) -> None:
+        self.api.polls.close(poll.poll_id, now)
+        self.target_cooldowns.start((poll.chat_id, poll.user_id))
+        self.history.append(poll.chat_id, poll.user_id, poll.date, int(now), poll.yes, poll.no, outcome)
+
+    def check_polls(self) -> None:
+        """Periodic task: close expired polls"""
+
+        with profiler.section('check_old_polls'):
+            self.check_old_polls()
+
+    def save(self) -> None:
+        """
+        Periodic task: save open polls, write finished ones to history and commit offset of processed updates
+
+        Offset is committed only after polls are saved, so updates that started or changed polls are read again if bot
+        crashed before saving them
+        """
+
+        with profiler.section('save_polls'):
+            self.api.save_polls()
+            self.history.flush()
+            self.api.commit_offset(self.queue.min_pending_id())
+
+    def report_command_processor(self, chat_id: int, from_id: int, args: list):
+        logger.logger.info('Starting processor for report command')
+        self.reports[(chat_id, from_id)] = None
+        self.api.send_message(chat_id, langapi.msg_descrb_problem(chat_id, self.settings))
+
+    def check_report_answers(self, updates: list) -> None:
+        """Collect answers of users that are writing bug report. First answer is problem, second is contact info"""
+
+        # Updates of batch come grouped by priority, but dialog needs them in order they were sent
+        for update in sorted(updates, key=lambda u: u.update_id):
+            message = update.message
+            if message is None or message.from_user is None or not message.text:
+                continue
+
+            chat_id = message.chat.id
+            from_id = message.from_user.id
+            text = message.text
+            is_report = text.startswith('/') and text.replace('@', ' ').split()[0] == '/report'
+            if is_report:
+                self.queued_reports.discard((chat_id, from_id))
+
+            if (chat_id, from_id) not in self.reports:
+                continue
+
+            if text.startswith('/'):
+                if is_report:
+                    self.reports[(chat_id, from_id)] = []
+                continue
+
+            answers = self.reports[(chat_id, from_id)]
+            if answers is None:
+                continue
+
+            answers += [text]
+
+            if len(answers) == 1:
+                logger.logger.debug('Asking for contact info')
+                self.api.send_message(chat_id, langapi.msg_give_contact_info(chat_id, self.settings))
+                continue
+
+            logger.logger.debug('Sending bug report')
+
+            del self.reports[(chat_id, from_id)]
+            report_custom_message(answers[0], answers[1])
+            self.api.send_message(chat_id, langapi.msg_bug_report_send(chat_id, self.settings))
+
+            logger.logger.info('Successfully sent bug report')
+
+    def change_lang_in_chat(self, chat_id: int, lang: str):
+        langapi.set_lang_for_chat(chat_id, lang, self.settings)
+        self.api.send_message(chat_id, langapi.msg_lang_notify(chat_id, self.settings))
+
+    def send_lang_inline(self, chat_id: int, from_id: int, args: list):
+        logger.logger.info('Sending inline lang chooser in chat #' + str(chat_id))
+        self.api.send_inline_question(chat_id, langapi.msg_lang_choose(chat_id, self.settings), langapi.get_all_langs(), self.change_lang_in_chat)
+
+    def is_chat_admin(self, chat_id: int, user_id: int) -> bool:
+        # Private chats have positive ids and the only user there can change anything
+        return chat_id > 0 or user_id in self.chat_info.get_administrators(chat_id)
 
-    report_custom_message(bug_report_msg, from_msg)
-    api.send_message(chat_id, langapi.msg_bug_report_send(chat_id))
-
-    logger.logger.info('Successfully sent bug report')
-
-
-def change_lang_in_chat(chat_id: int, lang: str):
-    langapi.set_lang_for_chat(chat_id, lang)
-    api.send_message(chat_id, langapi.msg_lang_notify(chat_id))
+    def send_settings(self, chat_id: int, from_id: int, args: list):
+        logger.logger.info('Sending settings of chat #' + str(chat_id))
+        settings = settingsapi.format_settings(self.settings.get_all(chat_id))
+        self.api.send_message(chat_id, langapi.msg_settings_info(chat_id, self.settings).replace('%SETTINGS%', settings))
+
+    def change_setting(self, chat_id: int, from_id: int, args: list):
+        if not self.is_chat_admin(chat_id, from_id):
+            self.api.send_message(chat_id, langapi.msg_not_admin(chat_id, self.settings))
+            return
 
+        try:
+            key, value = args
+            self.settings.set(chat_id, key, settingsapi.parse_setting(key, value))
+        except (ValueError, KeyError) as e:
+            logger.logger.debug('Wrong /set command in chat #' + str(chat_id) + ': ' + str(e))
+            self.api.send_message(chat_id, langapi.msg_settings_wrong(chat_id, self.settings))
+            return
 
-def send_lang_inline(chat_id: int, from_id: int):
-    logger.logger.info('Sending inline lang chooser in chat #' + str(chat_id))
-    api.send_inline_question(chat_id, langapi.msg_lang_choose(chat_id), langapi.get_all_langs(), change_lang_in_chat)
+        # Deadlines of running polls could be changed
+        self.api.polls.schedule_chat(chat_id)
+        self.api.send_message(chat_id, langapi.msg_settings_changed(chat_id, self.settings).replace('%NAME%', key))
 
+    def send_stats(self, chat_id: int, from_id: int, args: list):
+        """Send statistics of finished polls of chat. Optional argument is count of last days"""
 
-def main_loop() -> None:
-    global polls
-    logger.logger.info('Started main loop')
+        if not self.is_chat_admin(chat_id, from_id):
+            self.api.send_message(chat_id, langapi.msg_not_admin(chat_id, self.settings))
+            return
 
-    while True:
-        check_kick_candidates()
-        check_old_polls()
-        api.save_polls()
+        try:
+            since = self.clock.time() - float(args[0]) * 24 * 3600 if args else None
+        except ValueError:
+            since = None
+
+        stats = self.history.query(chat_id, since)
+        logger.logger.info('Sending stats of chat #' + str(chat_id))
+        self.api.send_message(chat_id, langapi.msg_stats(chat_id, self.settings)
+                              .replace('%POLLS%', str(stats['polls']))
+                              .replace('%KICKED%', str(stats['kicked']))
+                              .replace('%TURNOUT%', '{:.1f}'.format(stats['avg_turnout']))
+                              .replace('%DECISION%', '{:.1f}'.format(stats['avg_decision_time'] / 3600)))
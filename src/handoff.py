@@ -0,0 +1,103 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import json
+import os
+import signal
+import time
+
+from src import logger
+
+PID_FILENAME = 'bot.pid'
+HANDOFF_FILENAME = 'handoff.json'
+
+
+def write_pid_file() -> None:
+    with open(PID_FILENAME, 'w') as f:
+        f.write(str(os.getpid()))
+
+
+def remove_pid_file() -> None:
+    if os.path.isfile(PID_FILENAME) and _read_pid() == os.getpid():
+        os.remove(PID_FILENAME)
+
+
+def confirm_drained() -> None:
+    """Tell new process that this one has saved all its state and will not get updates anymore"""
+
+    logger.logger.info('Confirming handoff to new process')
+
+    with open(HANDOFF_FILENAME + '.tmp', 'w') as f:
+        f.write(json.dumps({'pid': os.getpid(), 'drained': True, 'time': time.time()}))
+    os.replace(HANDOFF_FILENAME + '.tmp', HANDOFF_FILENAME)
+
+
+def take_over(timeout: float = 60) -> bool:
+    """
+    Stop old process and wait until it confirms that it is drained. Returns False if it did not confirm in time
+
+    Must be called before bots are created, so offsets are loaded only after old process saved them. Is not
+    supported on Windows, where signals kill process at once
+    """
+
+    if os.name == 'nt':
+        logger.logger.error('Handoff is not supported on Windows')
+        return False
+
+    old_pid = _read_pid()
+    if old_pid is None or old_pid == os.getpid() or not _is_alive(old_pid):
+        logger.logger.info('There is no running bot process to take over')
+        return True
+
+    logger.logger.info('Taking over from process ' + str(old_pid))
+    os.kill(old_pid, signal.SIGTERM)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _is_drained(old_pid) or not _is_alive(old_pid):
+            logger.logger.info('Process ' + str(old_pid) + ' is drained, taking over')
+            return True
+        time.sleep(0.1)
+
+    logger.logger.error('Process ' + str(old_pid) + ' did not confirm handoff in ' + str(timeout) + ' seconds')
+    return False
+
+
+def _read_pid() -> int:
+    try:
+        with open(PID_FILENAME, 'r') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _is_drained(pid: int) -> bool:
+    try:
+        with open(HANDOFF_FILENAME, 'r') as f:
+            handoff = json.loads(f.read())
+    except (OSError, ValueError):
+        return False
+    return handoff['pid'] == pid and handoff['drained']
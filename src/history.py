@@ -0,0 +1,214 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import os
+import sys
+from array import array
+from itertools import compress
+
+from src import logger
+
+# numpy is imported only when first query is made, so it does not slow down start of bot
+numpy = None
+_numpy_imported = False
+
+CLOSED = 0
+KICKED = 1
+FAILED = 2  # poll decided to kick, but Telegram refused to kick
+
+# Column name and typecode of array that keeps it
+COLUMNS = (
+    ('chat_id', 'q'),
+    ('target', 'q'),
+    ('start', 'q'),
+    ('end', 'q'),
+    ('yes', 'I'),
+    ('no', 'I'),
+    ('outcome', 'b')
+)
+
+
+class VoteHistory:
+    """
+    Append-only archive of finished polls
+
+    Every column is kept in its own array and its own file, so new polls are appended to end of every file and queries
+    read only arrays they need. Queries are vectorized with numpy if it's installed
+
+    Appended polls are written to files only on flush(), so many polls finished at once cost one write per column
+    """
+
+    def __init__(self, directory: str = 'history'):
+        self.directory = directory
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        # Count of rows that are already written to files
+        self._written = 0
+
+    def __len__(self) -> int:
+        return len(self.columns['chat_id'])
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, name + '.col')
+
+    def load(self) -> None:
+        for name, typecode in COLUMNS:
+            column = array(typecode)
+            path = self._column_path(name)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                # Last value could be written only partly
+                column.frombytes(data[:len(data) // column.itemsize * column.itemsize])
+            self.columns[name] = column
+
+        # Process could be killed while appending poll, so only fully written rows are kept. Files are cut too,
+        # otherwise next rows would be appended after garbage and columns would not match
+        rows = min(len(column) for column in self.columns.values())
+        for name, column in self.columns.items():
+            path = self._column_path(name)
+            if os.path.isfile(path) and os.path.getsize(path) != rows * column.itemsize:
+                logger.logger.warning('Cutting ' + path + ' to ' + str(rows) + ' rows')
+                os.truncate(path, rows * column.itemsize)
+            del column[rows:]
+        self._written = rows
+
+    def append(self, chat_id: int, target: int, start: int, end: int, yes: int, no: int, outcome: int) -> None:
+        row = {'chat_id': chat_id, 'target': target, 'start': start, 'end': end, 'yes': yes, 'no': no, 'outcome': outcome}
+        for name, _ in COLUMNS:
+            self.columns[name].append(row[name])
+
+    def flush(self) -> None:
+        """Write polls that were appended since last flush to files"""
+
+        rows = len(self)
+        if rows == self._written:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        for name, _ in COLUMNS:
+            with open(self._column_path(name), 'ab') as f:
+                f.write(self.columns[name][self._written:rows].tobytes())
+        self._written = rows
+
+    def query(self, chat_id: int = None, since: int = None, until: int = None) -> dict:
+        """
+        Statistics of polls that were finished in chat (all chats if chat_id is None) from since till until
+
+        Returns dict with count of polls, count of kicks, kick rate, average turnout (count of votes) and average time
+        from start of poll to its end in seconds
+        """
+
+        if import_numpy() is not None:
+            return self._query_numpy(chat_id, since, until)
+        return self._query_python(chat_id, since, until)
+
+    def _query_numpy(self, chat_id: int, since: int, until: int) -> dict:
+        if not len(self):
+            return _stats(0, 0, 0, 0)
+
+        cols = {name: numpy.frombuffer(self.columns[name], dtype=typecode) for name, typecode in COLUMNS}
+
+        mask = numpy.ones(len(self), dtype=bool)
+        if chat_id is not None:
+            mask &= cols['chat_id'] == chat_id
+        if since is not None:
+            mask &= cols['end'] >= since
+        if until is not None:
+            mask &= cols['end'] < until
+
+        return _stats(int(mask.sum()),
+                      int((cols['outcome'][mask] == KICKED).sum()),
+                      int(cols['yes'][mask].sum(dtype=numpy.int64) + cols['no'][mask].sum(dtype=numpy.int64)),
+                      int((cols['end'][mask] - cols['start'][mask]).sum()))
+
+    def _query_python(self, chat_id: int, since: int, until: int) -> dict:
+        ends = self.columns['end']
+        mask = [True] * len(self)
+        if chat_id is not None:
+            mask = [m and c == chat_id for m, c in zip(mask, self.columns['chat_id'])]
+        if since is not None:
+            mask = [m and e >= since for m, e in zip(mask, ends)]
+        if until is not None:
+            mask = [m and e < until for m, e in zip(mask, ends)]
+
+        return _stats(sum(mask),
+                      sum(outcome == KICKED for outcome in compress(self.columns['outcome'], mask)),
+                      sum(compress(self.columns['yes'], mask)) + sum(compress(self.columns['no'], mask)),
+                      sum(compress(ends, mask)) - sum(compress(self.columns['start'], mask)))
+
+
+def import_numpy():
+    """Import numpy on first call. Returns numpy module or None if it's not installed"""
+
+    global numpy, _numpy_imported
+
+    if not _numpy_imported:
+        _numpy_imported = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+    return numpy
+
+
+def _stats(polls: int, kicked: int, votes: int, duration: int) -> dict:
+    return {
+        'polls': polls,
+        'kicked': kicked,
+        'kick_rate': kicked / polls if polls else 0.0,
+        'avg_turnout': votes / polls if polls else 0.0,
+        'avg_decision_time': duration / polls if polls else 0.0
+    }
+
+
+def format_stats(stats: dict) -> str:
+    return ('Polls: {}\nKicked: {} ({:.0%})\nAverage turnout: {:.1f} votes\nAverage time to decision: {:.1f} hours'
+            .format(stats['polls'], stats['kicked'], stats['kick_rate'], stats['avg_turnout'], stats['avg_decision_time'] / 3600))
+
+
+def main(argv: list) -> None:
+    """Print report: python -m src.history [history dir] [--chat ID] [--since TIMESTAMP] [--until TIMESTAMP]"""
+
+    import argparse
+    import logging
+    import time
+
+    parser = argparse.ArgumentParser(prog='python -m src.history', description='Report about finished polls')
+    parser.add_argument('directory', nargs='?', default='history')
+    parser.add_argument('--chat', type=int)
+    parser.add_argument('--since', type=int, help='unix time')
+    parser.add_argument('--until', type=int, help='unix time')
+    args = parser.parse_args(argv)
+
+    logger.logger = logger.AppLogger('history')
+    logger.logger.setLevel(logging.WARNING)
+    logger.logger.addHandler(logging.StreamHandler())
+
+    history = VoteHistory(args.directory)
+    history.load()
+
+    started = time.perf_counter()
+    stats = history.query(args.chat, args.since, args.until)
+    duration = time.perf_counter() - started
+
+    print(format_stats(stats))
+    print('Queried {} polls in {:.1f} ms ({})'.format(len(history), duration * 1000, 'numpy' if import_numpy() is not None else 'python'))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
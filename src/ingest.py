@@ -0,0 +1,84 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+from collections import deque
+
+from src import logger
+
+# Priority lanes, lower number is processed first
+INTERACTIVE = 0  # callback queries and poll updates
+COMMANDS = 1  # commands, mentions and answers in bot dialogs
+BOOKKEEPING = 2  # everything else, e.g. messages that are only used to discover chats
+
+
+class UpdateQueue:
+    """
+    Bounded queue of updates with priority lanes
+
+    Fetcher must not get more updates than free_space() returns, so interactive and command lanes never overflow and
+    updates wait on Telegram side instead (backpressure). Bookkeeping lane is shed: when it is full or other lanes
+    are overloaded its updates are dropped
+    """
+
+    def __init__(self, capacity: int = 1000, bookkeeping_capacity: int = 200):
+        self.capacity = capacity
+        self.bookkeeping_capacity = bookkeeping_capacity
+        self.lanes = (deque(), deque(), deque())
+        self.shed = 0
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self.lanes)
+
+    def free_space(self) -> int:
+        """How many updates can be fetched now"""
+
+        return max(0, self.capacity - max(len(self.lanes[INTERACTIVE]), len(self.lanes[COMMANDS])))
+
+    def is_overloaded(self) -> bool:
+        return len(self.lanes[INTERACTIVE]) + len(self.lanes[COMMANDS]) > self.capacity // 2
+
+    def put(self, update, lane: int) -> None:
+        if lane == BOOKKEEPING:
+            if self.is_overloaded():
+                self._shed()
+                return
+            if len(self.lanes[BOOKKEEPING]) >= self.bookkeeping_capacity:
+                self.lanes[BOOKKEEPING].popleft()
+                self._shed()
+
+        self.lanes[lane].append(update)
+
+    def pop_batch(self, count: int) -> list:
+        """Take up to count updates, most important first. Updates of one lane keep their order"""
+
+        batch = []
+        for lane in self.lanes:
+            while lane and len(batch) < count:
+                batch += [lane.popleft()]
+        return batch
+
+    def min_pending_id(self) -> int:
+        """Smallest update_id that is still in queue, or None if queue is empty"""
+
+        heads = [lane[0].update_id for lane in self.lanes if lane]
+        return min(heads) if heads else None
+
+    def _shed(self) -> None:
+        self.shed += 1
+        if self.shed % 100 == 1:
+            logger.logger.warning('Queue is overloaded, dropped ' + str(self.shed) + ' bookkeeping updates so far')
@@ -39,18 +39,18 @@ logger: AppLogger
 
 
 def clean_old_logs():
+    """Remove all old logs except 4 newest. Is not called by init() to keep startup fast"""
+
     log_dir = 'logs\\'
-    files = [f for f in os.listdir(log_dir) if os.path.isfile(os.path.join(log_dir, f)) and f.endswith('.log') and not f.startswith('latest')]
+    files = sorted(e.name for e in os.scandir(log_dir) if e.is_file() and e.name.endswith('.log') and not e.name.startswith('latest'))
     if len(files) > 4:
-        for log_file in files[4:]:
+        for log_file in files[:-4]:
             os.remove(os.path.join(log_dir, log_file))
 
 
 def init():
     global logger
 
-    clean_old_logs()
-
     logger = AppLogger(__name__)
     logger.setLevel(TRACE_LOGLEVEL)
     formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
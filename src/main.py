@@ -16,19 +16,31 @@
 #
 #    Copyright (c) 2019 Nikita Serba
 
+from src.timing import StartupTimer
+
+startup_timer = StartupTimer()
+
+import os
 import platform
+import signal
 import sys
+import threading
+import time
 
-from src import demobot, logger
-from src.botapi import TelegramBotAPI
+from src import handoff, logger
+from src.config import load_config
+from src.profiler import parse_profile_arg, profiler
+from src.retry import RetryPolicy
+from src.runtime import BotRuntime
 from src.sysbugs.bugtrackerapi import report_exception
-from src.syslang.langapi import load_chat_langs, msg_version_info
+from src.syslang.langapi import msg_version_info
 
 VERSION = '1.0.0-alpha.2'
 DEBUG_MODE = True
 
+startup_timer.mark('imports')
 logger.init()
-load_chat_langs()
+startup_timer.mark('logger init')
 
 
 def log_server_info():
@@ -42,26 +54,95 @@ def log_server_info():
                  '\nPython version: ' + platform.python_version())
 
 
+def report_bot_exception(bot, e: Exception):
+    report_exception(e)
+    print(str(e))
+
+
+def install_shutdown_handlers(runtime: BotRuntime, timeout: float):
+    """
+    First SIGTERM or SIGINT stops intake of updates, current batch is processed and state is saved. If it takes
+    more than timeout seconds or second signal comes process exits at once
+    """
+
+    def exit_now():
+        logger.logger.error('Bot did not stop in time, exiting without saving state')
+        os._exit(1)
+
+    def handler(signum, frame):
+        if runtime.stopping:
+            exit_now()
+
+        logger.logger.info('Got signal ' + str(signum) + ', stopping bot')
+        runtime.stop()
+
+        watchdog = threading.Timer(timeout, exit_now)
+        watchdog.daemon = True
+        watchdog.start()
+
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
+
+
 if __name__ == '__main__':
     logger.logger.info('Starting bot')
 
     log_server_info()
-    demobot.init_bot(DEBUG_MODE)
+    startup_timer.mark('server info')
+    config = load_config(DEBUG_MODE)
+    startup_timer.mark('config')
+    if '--handoff' in sys.argv[1:] and not handoff.take_over(config.get('handoff_timeout', 60)):
+        exit(1)
+    handoff.write_pid_file()
+    startup_timer.mark('handoff')
+    runtime = BotRuntime(config, DEBUG_MODE, None if DEBUG_MODE else report_bot_exception)
+    install_shutdown_handlers(runtime, config.get('shutdown_timeout', 30))
+    startup_timer.mark('bots init')
+    startup_timer.log_report()
+
+    logger.clean_old_logs()
 
-    if len(sys.argv) and sys.argv[1] == '--version-notify':
-        api = TelegramBotAPI(demobot.config['token'], DEBUG_MODE)
-        for chat in api.chats:
-            api.send_message(chat, msg_version_info(chat))
+    profiler.install_signal_handlers()
+    for arg in sys.argv[1:]:
+        if arg.startswith('--profile='):
+            profiler.request_capture(*parse_profile_arg(arg[len('--profile='):]))
+
+    if '--catch-up' in sys.argv[1:] or config.get('catch_up_on_start', False):
+        runtime.catch_up()
+
+    if '--version-notify' in sys.argv[1:]:
+        for bot in runtime.bots:
+            for chat in bot.api.chats:
+                bot.api.send_message(chat, msg_version_info(chat, bot.settings))
+        handoff.remove_pid_file()
         exit(0)
 
-    while True:
+    restart_policy = RetryPolicy(base_delay=1, max_delay=60)
+    restarts = 0
+
+    while not runtime.stopping:
+        started = time.monotonic()
         try:
             logger.logger.debug('Running main loop from beginning')
-            demobot.main_loop()
+            runtime.run()
         except Exception as e:
             if not DEBUG_MODE:
                 logger.logger.warning('Exception (Ignored)! ' + str(e))
                 report_exception(e)
                 print(str(e))
+                # Loop that worked long enough is healthy, so backoff starts from the beginning
+                if time.monotonic() - started >= config.get('healthy_run_time', 600):
+                    restarts = 0
+                runtime.wait(restart_policy.delay(restarts))
+                restarts += 1
             else:
+                runtime.flush()
                 raise e
+
+    try:
+        runtime.flush()
+    finally:
+        # flush() saves every bot even if some failed, so new process can take over anyway
+        handoff.confirm_drained()
+        handoff.remove_pid_file()
+    logger.logger.info('Bot stopped')
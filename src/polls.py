@@ -0,0 +1,219 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import heapq
+import json
+import os
+from array import array
+
+from src import logger
+
+
+class Poll:
+    """Kick poll. Vote counts are kept in compact array, one item per option"""
+
+    __slots__ = ('poll_id', 'chat_id', 'user_id', 'name', 'date', 'votes', 'closed_date')
+
+    def __init__(self, poll_id: int, chat_id: int, date: int, options_count: int = 2, user_id: int = 0, name: str = ''):
+        self.poll_id = poll_id
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.name = name
+        self.date = date
+        self.votes = array('L', [0]) * options_count
+        self.closed_date = 0
+
+    @property
+    def yes(self) -> int:
+        return self.votes[0]
+
+    @property
+    def no(self) -> int:
+        return self.votes[1]
+
+    def update_votes(self, options: list) -> None:
+        """Take vote counts from options list of Telegram's Poll object"""
+
+        for i, option in enumerate(options):
+            self.votes[i] = option['voter_count']
+
+    def to_list(self) -> list:
+        return [self.poll_id, self.chat_id, self.user_id, self.name, self.date, self.votes.tolist()]
+
+    @staticmethod
+    def from_list(record: list):
+        poll = Poll(record[0], record[1], record[4], len(record[5]), record[2], record[3])
+        poll.votes = array('L', record[5])
+        return poll
+
+
+class PollStore:
+    """
+    Keeps open polls and saves them to file. Finished polls are kept only for retention period and never saved
+
+    Open polls are also indexed by (chat_id, user_id) of their target, so check for already running poll is O(1),
+    and kept in heap by time of their next check, so only polls that are due are checked
+    """
+
+    def __init__(self, filename: str, retention: int = 3600):
+        self.filename = filename
+        self.retention = retention
+        self._open = {}
+        self._by_target = {}
+        self._due = []
+        self._next_check = {}
+        self._finished = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def __contains__(self, poll_id: int) -> bool:
+        return poll_id in self._open
+
+    def open_polls(self) -> list:
+        return list(self._open.values())
+
+    def get(self, poll_id: int) -> Poll:
+        """Return open or recently finished poll, raises KeyError if there is no such poll"""
+
+        if poll_id in self._open:
+            return self._open[poll_id]
+        return self._finished[poll_id]
+
+    def add(self, poll: Poll) -> None:
+        self._open[poll.poll_id] = poll
+        if poll.user_id:
+            self._by_target[(poll.chat_id, poll.user_id)] = poll.poll_id
+        self.schedule(poll.poll_id, 0)
+        self._dirty = True
+
+    def schedule(self, poll_id: int, when: float) -> None:
+        """Check poll again at time when. 0 means on next check"""
+
+        scheduled = self._next_check.get(poll_id)
+        if scheduled is not None and scheduled <= when:
+            return
+        self._next_check[poll_id] = when
+        heapq.heappush(self._due, (when, poll_id))
+
+    def schedule_chat(self, chat_id: int) -> None:
+        """Check all open polls of chat on next check"""
+
+        for poll in self._open.values():
+            if poll.chat_id == chat_id:
+                self.schedule(poll.poll_id, 0)
+
+    def next_due(self, now: float) -> Poll:
+        """Take next open poll that must be checked at now, or return None. Poll must be closed or scheduled again"""
+
+        while self._due and self._due[0][0] <= now:
+            when, poll_id = heapq.heappop(self._due)
+            # Entries of closed polls and entries replaced by earlier check are skipped
+            if self._next_check.get(poll_id) != when:
+                continue
+            del self._next_check[poll_id]
+            return self._open[poll_id]
+        return None
+
+    def set_target(self, poll_id: int, user_id: int, name: str) -> None:
+        """Set user that poll is about"""
+
+        poll = self._open[poll_id]
+        poll.user_id = user_id
+        poll.name = name
+        self._by_target[(poll.chat_id, user_id)] = poll_id
+        self._dirty = True
+
+    def find_by_target(self, chat_id: int, user_id: int) -> Poll:
+        """Return open poll about user in chat, or None"""
+
+        poll_id = self._by_target.get((chat_id, user_id))
+        return self._open[poll_id] if poll_id is not None else None
+
+    def update_votes(self, poll_id: int, options: list) -> None:
+        """Update vote counts of open poll. Updates of unknown and finished polls are ignored"""
+
+        poll = self._open.get(poll_id)
+        if poll is not None:
+            poll.update_votes(options)
+            self.schedule(poll_id, 0)
+            self._dirty = True
+
+    def close(self, poll_id: int, now: float) -> Poll:
+        poll = self._open.pop(poll_id)
+        self._next_check.pop(poll_id, None)
+        if self._by_target.get((poll.chat_id, poll.user_id)) == poll_id:
+            del self._by_target[(poll.chat_id, poll.user_id)]
+        poll.closed_date = int(now)
+        self._finished[poll_id] = poll
+        self._dirty = True
+        return poll
+
+    def evict_finished(self, now: float) -> None:
+        """Forget all polls that were finished more than retention seconds ago"""
+
+        # Polls are finished in order of closing, so only the oldest ones have to be checked
+        old = []
+        for poll_id, poll in self._finished.items():
+            if now - poll.closed_date < self.retention:
+                break
+            old.append(poll_id)
+        for poll_id in old:
+            del self._finished[poll_id]
+
+        if old:
+            logger.logger.debug('Evicted ' + str(len(old)) + ' finished polls')
+
+    def load(self) -> None:
+        """Load open polls from file"""
+
+        logger.logger.info('Loading polls from ' + self.filename)
+
+        if not os.path.exists(self.filename):
+            logger.logger.info('Polls file does not exist')
+            return
+
+        with open(self.filename, 'r') as f:
+            records = json.loads(f.read())
+
+        if isinstance(records, dict):
+            logger.logger.warning('Polls file has old format without chat info. Ignoring it')
+            return
+
+        for record in records:
+            poll = Poll.from_list(record)
+            self._open[poll.poll_id] = poll
+            if poll.user_id:
+                self._by_target[(poll.chat_id, poll.user_id)] = poll.poll_id
+            self.schedule(poll.poll_id, 0)
+
+    def save(self) -> None:
+        """Save open polls to file if something was changed since last saving"""
+
+        if not self._dirty:
+            return
+
+        logger.logger.trace('Saving polls to file')
+
+        # File is replaced at once, so crash while saving does not leave broken file
+        with open(self.filename + '.tmp', 'w') as f:
+            f.write(json.dumps([poll.to_list() for poll in self._open.values()], separators=(',', ':')))
+        os.replace(self.filename + '.tmp', self.filename)
+
+        self._dirty = False
@@ -0,0 +1,148 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import datetime
+import os
+import signal
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from src import logger
+
+CPU = 'cpu'
+MEMORY = 'memory'
+
+
+class LoopProfiler:
+    """
+    On-demand profiling of main loop
+
+    Keeps rolling timings of main loop sections and can capture cProfile or tracemalloc data for next N iterations.
+    Capture is only requested by request_capture() (it is safe to call it from signal handler) and really starts on
+    the beginning of next iteration
+    """
+
+    def __init__(self, window: int = 100, report_every: int = 1000, output_dir: str = 'profiles'):
+        self.window = window
+        self.report_every = report_every
+        self.output_dir = output_dir
+        self.timings = {}
+        self.iterations = 0
+
+        self._requested = None
+        self._kind = None
+        self._left = 0
+        self._profile = None
+        self._snapshot = None
+
+    @contextmanager
+    def section(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if name not in self.timings:
+                self.timings[name] = deque(maxlen=self.window)
+            self.timings[name].append(time.perf_counter() - started)
+
+    def request_capture(self, kind: str, iterations: int = 100) -> None:
+        if kind not in (CPU, MEMORY):
+            raise ValueError('Unknown capture kind: ' + kind)
+        self._requested = (kind, iterations)
+
+    def iteration_started(self) -> None:
+        if self._requested is not None and self._kind is None:
+            self._start_capture(*self._requested)
+            self._requested = None
+
+    def iteration_finished(self) -> None:
+        self.iterations += 1
+
+        if self._kind is not None:
+            self._left -= 1
+            if self._left <= 0:
+                self._finish_capture()
+
+        if self.report_every and self.iterations % self.report_every == 0:
+            logger.logger.debug('Main loop timings for last ' + str(self.window) + ' iterations:\n' + self.breakdown())
+
+    def breakdown(self) -> str:
+        lines = []
+        for name, durations in self.timings.items():
+            if durations:
+                lines += ['  {:<24} avg {:8.2f} ms, max {:8.2f} ms'.format(
+                    name, sum(durations) / len(durations) * 1000, max(durations) * 1000)]
+        return '\n'.join(lines)
+
+    def install_signal_handlers(self, iterations: int = 100) -> None:
+        """SIGUSR1 captures cProfile, SIGUSR2 captures tracemalloc. There are no such signals on Windows"""
+
+        if not hasattr(signal, 'SIGUSR1'):
+            logger.logger.info('Profiling signals are not supported on this platform')
+            return
+
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.request_capture(CPU, iterations))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.request_capture(MEMORY, iterations))
+
+    def _start_capture(self, kind: str, iterations: int) -> None:
+        logger.logger.info('Starting ' + kind + ' profiling for ' + str(iterations) + ' iterations')
+
+        self._kind = kind
+        self._left = iterations
+
+        if kind == CPU:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            import tracemalloc
+            tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def _finish_capture(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        filename = os.path.join(self.output_dir, self._kind + datetime.datetime.now().strftime('_%Y.%m.%d_%H-%M-%S'))
+
+        if self._kind == CPU:
+            self._profile.disable()
+            filename += '.prof'
+            self._profile.dump_stats(filename)
+            self._profile = None
+        else:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            filename += '.txt'
+            with open(filename, 'w') as f:
+                for stat in snapshot.compare_to(self._snapshot, 'lineno')[:50]:
+                    f.write(str(stat) + '\n')
+            self._snapshot = None
+
+        logger.logger.info('Saved ' + self._kind + ' profile to ' + filename)
+        self._kind = None
+
+
+def parse_profile_arg(arg: str) -> tuple:
+    """Parse value of --profile flag, e.g. cpu:200 or memory"""
+
+    kind, _, iterations = arg.partition(':')
+    return kind, int(iterations) if iterations else 100
+
+
+profiler = LoopProfiler()
@@ -0,0 +1,125 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import random
+import time
+
+from src import logger
+
+
+class RetryPolicy:
+    """
+    How many times and how often api method is retried
+
+    Methods that are not idempotent (sending messages, polls, kicks) are retried only when it is known that request
+    was not processed by Telegram, so their effect is never duplicated
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 30, idempotent: bool = True, timeout: float = 10):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idempotent = idempotent
+        self.timeout = timeout
+
+    def delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter. attempt starts from 0"""
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** min(attempt, 32)))
+
+    def can_retry(self, attempt: int, safe: bool) -> bool:
+        """
+        Params:
+        attempt: int - count of attempts that were already done
+        safe: bool - True if request surely was not processed, e.g. connection was not established
+        """
+
+        return attempt < self.max_attempts and (safe or self.idempotent)
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+POLICIES = {
+    'getUpdates': RetryPolicy(max_attempts=5),
+    'getChatAdministrators': RetryPolicy(),
+    'getChatMembersCount': RetryPolicy(),
+    'sendMessage': RetryPolicy(idempotent=False),
+    'sendPoll': RetryPolicy(idempotent=False),
+    'kickChatMember': RetryPolicy(idempotent=False)
+}
+
+
+class CircuitBreaker:
+    """
+    Stops all requests to api after several failures in a row
+
+    After reset_timeout one probe request is allowed. If it succeeds breaker is closed again, otherwise it stays open
+    and reset_timeout is doubled (up to max_reset_timeout)
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5, max_reset_timeout: float = 300, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        if self.state == CircuitBreaker.CLOSED:
+            return True
+
+        if self.state == CircuitBreaker.OPEN and self.time_until_retry() == 0:
+            logger.logger.info('Circuit breaker is half-open, sending probe request')
+            self.state = CircuitBreaker.HALF_OPEN
+            return True
+
+        return False
+
+    def time_until_retry(self) -> float:
+        if self.state == CircuitBreaker.CLOSED:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - self.clock())
+
+    def record_success(self) -> None:
+        if self.state != CircuitBreaker.CLOSED:
+            logger.logger.info('Circuit breaker is closed, api is available again')
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self) -> None:
+        self.failures += 1
+
+        if self.state == CircuitBreaker.HALF_OPEN:
+            self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+            self._open()
+        elif self.state == CircuitBreaker.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        logger.logger.warning('Circuit breaker is open after ' + str(self.failures) + ' failures, pausing requests for ' + str(self.reset_timeout) + ' seconds')
+        self.state = CircuitBreaker.OPEN
+        self._opened_at = self.clock()
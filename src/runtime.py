@@ -0,0 +1,167 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import os
+import threading
+
+from src import logger
+from src.botapi import TelegramUnavailableException, breaker, session
+from src.clock import system_clock
+from src.demobot import DemoBot
+from src.profiler import profiler
+from src.scheduler import Scheduler
+
+
+def load_bot_configs(config: dict) -> list:
+    """
+    Return config of every bot
+
+    If config has "bots" list every item of it is merged over top-level config, so bots share all options they do not
+    override. Otherwise top-level config is the only bot
+
+    Raises ValueError if several bots have same data_dir, because they would overwrite offset and polls of each other
+    """
+
+    bots = config.get('bots') or [{}]
+    configs = []
+    data_dirs = {}
+    for bot in bots:
+        bot_config = {k: v for k, v in config.items() if k != 'bots'}
+        bot_config.update(bot)
+
+        data_dir = os.path.normcase(os.path.abspath(bot_config.get('data_dir', '')))
+        if data_dir in data_dirs:
+            raise ValueError('Bots ' + data_dirs[data_dir] + ' and ' + bot_config['bot_username'] + ' have same data_dir, '
+                             'set own "data_dir" for every bot')
+        data_dirs[data_dir] = bot_config['bot_username']
+
+        configs += [bot_config]
+    return configs
+
+
+class BotRuntime:
+    """Runs several bots in one process. Bots share one HTTP connection pool, one scheduler and one logger"""
+
+    def __init__(self, config: dict, debug: bool = False, error_handler=None, clock=system_clock, session_=None):
+        """
+        Params:
+        config: dict - loaded config, see load_bot_configs()
+        error_handler - called with bot and exception when bot fails. If None exceptions are raised
+        clock - source of time for bots and scheduler, see src/clock.py
+        session_ - session that bots send requests with. Shared session of botapi is used if None
+        """
+
+        self.config = config
+        self.error_handler = error_handler
+        self.idle_sleep = config.get('idle_sleep', 0.5)
+        self.clock = clock
+        self.scheduler = Scheduler(clock.monotonic)
+        self.bots = []
+        self._stop_event = threading.Event()
+
+        for bot_config in load_bot_configs(config):
+            self.add_bot(DemoBot(bot_config, debug, session_ or session, clock))
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    def add_bot(self, bot: DemoBot) -> None:
+        # Retry delays are cut short when runtime is stopping
+        bot.api.sleep = self._stop_event.wait
+        self.bots += [bot]
+        self.scheduler.call_every(bot.config.get('poll_check_interval', 5), lambda: self._guarded(bot, bot.check_polls))
+        self.scheduler.call_every(bot.config.get('save_interval', 5), lambda: self._guarded(bot, bot.save))
+        logger.logger.info('Hosting bot ' + bot.name + ' (' + str(len(self.bots)) + ' bots in process)')
+
+    def _guarded(self, bot: DemoBot, func, *args):
+        """Run func so that error in one bot does not stop other ones"""
+
+        try:
+            return func(*args)
+        except TelegramUnavailableException as e:
+            # Breaker is open, nothing to report. Bot will try again when api is back
+            logger.logger.debug('Bot ' + bot.name + ' is waiting for api: ' + str(e))
+        except Exception as e:
+            if self.error_handler is None:
+                raise
+            logger.logger.warning('Exception in bot ' + bot.name + ': ' + str(e))
+            self.error_handler(bot, e)
+
+    def catch_up(self) -> None:
+        """Catch up updates of every bot. Stops when stop() is called, state is saved by flush() then"""
+
+        for bot in self.bots:
+            if self.stopping:
+                break
+            self._guarded(bot, bot.catch_up, lambda: self.stopping)
+
+    def run_once(self) -> int:
+        """Process one batch of updates of every bot and run due scheduled tasks. Returns count of processed updates"""
+
+        count = 0
+
+        profiler.iteration_started()
+        with profiler.section('check_kick_candidates'):
+            for bot in self.bots:
+                count += self._guarded(bot, bot.check_kick_candidates) or 0
+        self.scheduler.run_pending()
+        profiler.iteration_finished()
+
+        return count
+
+    def run(self) -> None:
+        """Run bots until stop() is called. Current batch of updates is always processed to the end"""
+
+        logger.logger.info('Started main loop')
+
+        while not self.stopping:
+            if self.run_once() == 0 and not any(len(bot.queue) for bot in self.bots):
+                next_task = self.scheduler.time_until_next()
+                self.wait(max(breaker.time_until_retry(), self.idle_sleep if next_task is None else min(self.idle_sleep, next_task)))
+
+    def wait(self, timeout: float) -> None:
+        """Sleep for timeout seconds or until stop() is called"""
+
+        self._stop_event.wait(timeout)
+
+    def stop(self) -> None:
+        """Ask runtime to stop intake of updates. Safe to call from signal handler"""
+
+        self._stop_event.set()
+
+    def flush(self) -> None:
+        """Save state of all bots. If some bot failed, first exception is raised after all bots are saved"""
+
+        errors = []
+
+        for bot in self.bots:
+            logger.logger.info('Saving state of bot ' + bot.name)
+            # State is saved even if processing of queued updates failed, and one failed bot does not stop saving others
+            try:
+                try:
+                    while len(bot.queue):
+                        self._guarded(bot, bot.process_updates)
+                finally:
+                    bot.save()
+            except Exception as e:
+                logger.logger.error('Exception while saving state of bot ' + bot.name + ': ' + str(e))
+                errors += [e]
+
+        if errors:
+            raise errors[0]
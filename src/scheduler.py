@@ -0,0 +1,70 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import heapq
+import itertools
+import time
+
+from src import logger
+
+
+class Scheduler:
+    """Timer scheduler shared by all bots in process. Tasks are kept in heap ordered by time of next run"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._tasks = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def call_later(self, delay: float, func, interval: float = 0) -> None:
+        """Run func after delay seconds. If interval is set func will be run every interval seconds after that"""
+
+        heapq.heappush(self._tasks, (self.clock() + delay, next(self._counter), func, interval))
+
+    def call_every(self, interval: float, func) -> None:
+        self.call_later(interval, func, interval)
+
+    def time_until_next(self) -> float:
+        """Seconds until next task must run, or None if there are no tasks"""
+
+        if not self._tasks:
+            return None
+        return max(0.0, self._tasks[0][0] - self.clock())
+
+    def run_pending(self) -> int:
+        """Run all tasks that are due. Returns count of tasks that were run"""
+
+        count = 0
+        now = self.clock()
+
+        while self._tasks and self._tasks[0][0] <= now:
+            when, _, func, interval = heapq.heappop(self._tasks)
+            if interval:
+                # If task is late, missed runs are skipped instead of running it several times in a row
+                next_run = when + interval if when + interval > now else now + interval
+                heapq.heappush(self._tasks, (next_run, next(self._counter), func, interval))
+            count += 1
+            func()
+
+        if count:
+            logger.logger.trace('Ran ' + str(count) + ' scheduled tasks')
+
+        return count
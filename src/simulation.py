@@ -0,0 +1,267 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+"""
+Accelerated simulation of poll lifecycle
+
+Bot runs against in-process fake of Telegram with virtual clock, so hours of polls pass in seconds. Used to benchmark
+scheduler cost, memory growth and kick throughput with many polls:
+
+    python -m src.simulation --polls 100000
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+
+from src import logger
+from src.clock import VirtualClock
+from src.runtime import BotRuntime
+
+try:
+    import resource
+except ImportError:
+    # There is no resource module on Windows
+    resource = None
+
+BOT_USERNAME = '@simulation_bot'
+BOT_ID = 2
+ADMIN_ID = 1
+
+
+class FakeResponse:
+    def __init__(self, result):
+        self.status_code = 200
+        self.content = json.dumps({'ok': True, 'result': result}).encode()
+
+
+class FakeTelegram:
+    """
+    Fake of requests.Session that answers bot api methods. Updates are kept in heap by virtual time they come at
+
+    Every mention starts poll, and every poll gets votes some time after it was sent, so polls go all the way from
+    mention to kick or closing
+    """
+
+    def __init__(self, clock: VirtualClock, seed: int = 0):
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.kick_share = 0.6
+        self.bot_can_ban = True
+        self.kicks = 0
+        self.requests = 0
+        self._events = []
+        self._counter = itertools.count()
+        self._ready = []
+        self._update_id = 0
+        self._poll_id = 0
+
+    def next_event_time(self) -> float:
+        """Virtual time of next update, or None if there are no more updates"""
+
+        if self._ready:
+            return self.clock.time()
+        return self._events[0][0] if self._events else None
+
+    def add_event(self, when: float, update: dict) -> None:
+        heapq.heappush(self._events, (when, next(self._counter), update))
+
+    def add_mention(self, when: float, chat_id: int, target_id: int, initiator_id: int) -> None:
+        self.add_event(when, {'message': {
+            'message_id': target_id, 'date': int(when), 'text': BOT_USERNAME,
+            'chat': {'id': chat_id, 'type': 'group'},
+            'from': {'id': initiator_id, 'first_name': 'Initiator'},
+            'reply_to_message': {
+                'message_id': target_id - 1, 'date': int(when), 'chat': {'id': chat_id, 'type': 'group'},
+                'from': {'id': target_id, 'first_name': 'Target', 'username': 'target' + str(target_id)}
+            }
+        }})
+
+    def get(self, url: str, params: dict = None, timeout: float = None) -> FakeResponse:
+        self.requests += 1
+        method = url.rsplit('/', 1)[1]
+        return FakeResponse(getattr(self, '_' + method)(params or {}))
+
+    def _getUpdates(self, params: dict) -> list:
+        now = self.clock.time()
+        while self._events and self._events[0][0] <= now:
+            update = heapq.heappop(self._events)[2]
+            self._update_id += 1
+            update['update_id'] = self._update_id
+            self._ready += [update]
+
+        # Updates before offset are confirmed by bot
+        offset = params.get('offset', 0)
+        confirmed = 0
+        while confirmed < len(self._ready) and self._ready[confirmed]['update_id'] < offset:
+            confirmed += 1
+        del self._ready[:confirmed]
+
+        return self._ready[:params.get('limit', 100)]
+
+    def _sendPoll(self, params: dict) -> dict:
+        self._poll_id += 1
+        now = self.clock.time()
+
+        yes, no = (3, 1) if self.random.random() < self.kick_share else (1, 2)
+        first_vote = now + self.random.uniform(10, 600)
+        second_vote = first_vote + self.random.uniform(10, 3600)
+        for when, votes in ((first_vote, (1, 0)), (second_vote, (yes, no))):
+            self.add_event(when, {'poll': {'id': str(self._poll_id), 'options': [
+                {'text': 'yes', 'voter_count': votes[0]}, {'text': 'no', 'voter_count': votes[1]}
+            ]}})
+
+        return {'message_id': self._poll_id, 'date': int(now), 'poll': {'id': str(self._poll_id), 'options': []}}
+
+    def _sendMessage(self, params: dict) -> dict:
+        return {'message_id': 0}
+
+    def _kickChatMember(self, params: dict) -> bool:
+        self.kicks += 1
+        return True
+
+    def _getMe(self, params: dict) -> dict:
+        return {'id': BOT_ID, 'is_bot': True, 'first_name': 'Simulation', 'username': BOT_USERNAME[1:]}
+
+    def _getChatAdministrators(self, params: dict) -> list:
+        return [{'user': {'id': ADMIN_ID}, 'status': 'creator'},
+                {'user': {'id': BOT_ID}, 'status': 'administrator', 'can_restrict_members': self.bot_can_ban}]
+
+    def _getChatMembersCount(self, params: dict) -> int:
+        return 100
+
+
+def max_rss() -> int:
+    """Peak resident memory of process in kilobytes, or 0 if it is unknown on this platform"""
+
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def simulate(polls: int, arrival_period: float = 3600, polls_per_chat: int = 100, seed: int = 0) -> dict:
+    """
+    Push polls mentions through bot, arriving evenly during arrival_period virtual seconds, and run bot until every
+    poll is finished. Returns dict with results
+    """
+
+    clock = VirtualClock(1600000000)
+    telegram = FakeTelegram(clock, seed)
+
+    for i in range(polls):
+        telegram.add_mention(clock.time() + arrival_period * i / polls, -1000 - i // polls_per_chat, 1000 + i * 2, 10 ** 9 + i)
+
+    data_dir = tempfile.TemporaryDirectory()
+    config = {
+        'token': 'simulation',
+        'bot_username': BOT_USERNAME,
+        'data_dir': data_dir.name,
+        # Every saving writes all open polls, so they are saved rarely to measure bot and not disk
+        'save_interval': 3600
+    }
+    runtime = BotRuntime(config, clock=clock, session_=telegram)
+    bot = runtime.bots[0]
+
+    scheduler_time = 0
+    scheduler_runs = 0
+    run_pending = runtime.scheduler.run_pending
+
+    def timed_run_pending() -> int:
+        nonlocal scheduler_time, scheduler_runs
+        started = time.perf_counter()
+        try:
+            return run_pending()
+        finally:
+            scheduler_time += time.perf_counter() - started
+            scheduler_runs += 1
+
+    runtime.scheduler.run_pending = timed_run_pending
+
+    started_at = clock.time()
+    rss_before = max_rss()
+    started = time.perf_counter()
+
+    while len(bot.history) < polls:
+        if runtime.run_once() or len(bot.queue):
+            continue
+
+        # Like BotRuntime.run() bot sleeps at least idle_sleep when there are no updates, but virtual clock skips
+        # time when nothing happens
+        next_event = telegram.next_event_time()
+        if next_event is None and not len(bot.api.polls):
+            break
+        now = clock.time()
+        wake_up = now + runtime.scheduler.time_until_next()
+        if next_event is not None:
+            wake_up = min(wake_up, max(next_event, now + runtime.idle_sleep))
+        clock.advance(wake_up - now)
+
+    duration = time.perf_counter() - started
+    runtime.flush()
+    data_dir.cleanup()
+
+    return {
+        'polls': len(bot.history),
+        'kicked': telegram.kicks,
+        'requests': telegram.requests,
+        'virtual_hours': (clock.time() - started_at) / 3600,
+        'duration': duration,
+        'kicks_per_second': telegram.kicks / duration if duration > 0 else 0.0,
+        'scheduler_time': scheduler_time,
+        'scheduler_runs': scheduler_runs,
+        'rss_growth': max_rss() - rss_before
+    }
+
+
+def format_results(results: dict) -> str:
+    return '\n'.join([
+        'Finished {} polls ({} kicked) in {:.1f} virtual hours'.format(results['polls'], results['kicked'], results['virtual_hours']),
+        'Wall time: {:.2f} s, {} api requests'.format(results['duration'], results['requests']),
+        'Kick throughput: {:.0f} kicks/s'.format(results['kicks_per_second']),
+        'Scheduler: {:.2f} s in {} runs ({:.3f} ms per run)'.format(
+            results['scheduler_time'], results['scheduler_runs'],
+            results['scheduler_time'] / results['scheduler_runs'] * 1000 if results['scheduler_runs'] else 0.0),
+        'Peak memory growth: {} KB'.format(results['rss_growth'])
+    ])
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description='Run bot against fake Telegram with virtual clock')
+    parser.add_argument('--polls', type=int, default=100000, help='count of polls to push through lifecycle')
+    parser.add_argument('--arrival-period', type=float, default=3600, help='virtual seconds during which mentions come')
+    parser.add_argument('--polls-per-chat', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logger.logger = logger.AppLogger('simulation')
+    logger.logger.setLevel(logging.WARNING)
+    logger.logger.addHandler(logging.StreamHandler())
+
+    print(format_results(simulate(args.polls, args.arrival_period, args.polls_per_chat, args.seed)))
+
+
+if __name__ == '__main__':
+    main()
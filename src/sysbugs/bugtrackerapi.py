@@ -17,10 +17,15 @@
 #    Copyright (c) 2019 Nikita Serba
 
 import os
+import time
 
-from src.sysbugs import mailutil
 from src import logger
 
+# Same exception is reported at most once per this count of seconds
+REPORT_INTERVAL = 600
+
+_last_reports = {}
+
 
 def get_log_files() -> list:
     logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..\\..\\logs\\')
@@ -31,10 +36,20 @@ def get_log_files() -> list:
 
 
 def report_custom_message(msg: str, from_email: str):
+    # Mail stack is heavy and needed only when something is reported, so it is imported here
+    from src.sysbugs import mailutil
+
     logger.logger.info('Reporting "' + msg + '" from ' + from_email)
     mailutil.send_email(mailutil._parse_mail_info()['bug_tracker_email'], 'Bug Report', 'New bug report!\n' + msg + '\nFrom: ' + from_email, get_log_files())
 
 
 def report_exception(e: Exception):
+    now = time.time()
+    if now - _last_reports.get(str(e), 0) < REPORT_INTERVAL:
+        logger.logger.debug('Exception was already reported recently: ' + str(e))
+        return
+
+    _last_reports[str(e)] = now
+
     logger.logger.info('Reporting exception: ' + str(e))
     report_custom_message(str(e), 'None')
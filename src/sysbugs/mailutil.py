@@ -18,11 +18,6 @@
 
 import json
 import os
-from smtplib import SMTP
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
 
 from src import logger
 
@@ -35,6 +30,12 @@ def _parse_mail_info():
 
 
 def send_email(to: str, re: str, msg_: str, files: list):
+    from smtplib import SMTP
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.base import MIMEBase
+    from email import encoders
+
     mail_info = _parse_mail_info()
 
     logger.logger.info('Sending email to ' + to)
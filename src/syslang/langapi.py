@@ -20,99 +20,125 @@ import os
 import json
 
 from src import logger
-
-lang_by_chat = {}
+from src.syssettings import settingsapi
 
 CHAT_LANG_FILE = 'chat_langs.json'
 
+_translations = {}
 
-def set_lang_for_chat(chat_id: int, lang: str) -> None:
-    global lang_by_chat
 
+def set_lang_for_chat(chat_id: int, lang: str, settings: settingsapi.ChatSettingsStore = None) -> None:
     logger.logger.info('Changing lang for chat #' + str(chat_id) + ' to ' + lang)
 
-    lang_by_chat[chat_id] = lang
-    save_chat_langs()
+    (settings or settingsapi.store).set(chat_id, 'lang', lang)
 
 
 def get_lang_name_by_code(code: str) -> str:
-    lang_file = os.path.join(os.path.dirname(__file__), '..\\..\\langs\\' + code + '.json')
+    lang_file = os.path.join(os.path.dirname(__file__), '..', '..', 'langs', code + '.json')
     with open(lang_file, 'r', encoding='utf-8') as f:
         return json.loads(f.read())['name']
 
 
 def get_all_langs() -> list:
-    langs_path = os.path.join(os.path.dirname(__file__), '..\\..\\langs\\')
+    langs_path = os.path.join(os.path.dirname(__file__), '..', '..', 'langs')
     return [[get_lang_name_by_code(f[:-5]), f[:-5]] for f in os.listdir(langs_path) if f.endswith('.json') and os.path.isfile(os.path.join(langs_path, f))]
 
 
-def _get_trans_str(chat_id: int, name: str) -> str:
-    code = 'en-US' if chat_id not in lang_by_chat.keys() else lang_by_chat[chat_id]
+def _get_translation(code: str) -> dict:
+    """Read lang file only once, next calls are served from memory"""
+
+    if code not in _translations:
+        lang_file = os.path.join(os.path.dirname(__file__), '..', '..', 'langs', code + '.json')
+        with open(lang_file, 'r', encoding='utf-8') as f:
+            _translations[code] = json.loads(f.read())['translation']
+
+    return _translations[code]
 
-    lang_file = os.path.join(os.path.dirname(__file__), '..\\..\\langs\\' + code + '.json')
-    with open(lang_file, 'r', encoding='utf-8') as f:
-        langs = json.loads(f.read())
 
-    return langs['translation'][name]
+def _get_trans_str(chat_id: int, name: str, settings: settingsapi.ChatSettingsStore = None) -> str:
+    """Get string in lang of chat. Lang is taken from settings of bot, default settings store is used if it's None"""
 
+    return _get_translation((settings or settingsapi.store).get(chat_id, 'lang'))[name]
 
-def load_chat_langs():
-    global lang_by_chat
+
+def load_chat_langs(settings: settingsapi.ChatSettingsStore = None):
+    """Load chat's settings. Langs from old chat_langs.json are moved to settings"""
 
     logger.logger.info('Reading chat\'s langs')
 
-    file_full_path = os.path.join(os.path.dirname(__file__), '..\\..\\' + CHAT_LANG_FILE)
-    if os.path.exists(file_full_path):
-        with open(file_full_path, 'r') as f:
-            lang_by_chat_ = json.loads(f.read())
+    settings = settings or settingsapi.store
+    settings.load()
+
+    file_full_path = os.path.join(os.path.dirname(__file__), '..', '..', CHAT_LANG_FILE)
+    if not os.path.exists(file_full_path):
+        return
+
+    logger.logger.info('Moving chat\'s langs from ' + CHAT_LANG_FILE + ' to chat\'s settings')
+
+    with open(file_full_path, 'r') as f:
+        lang_by_chat_ = json.loads(f.read())
 
     for k, v in lang_by_chat_.items():
-        lang_by_chat[int(k)] = v
+        settings.set(int(k), 'lang', v)
+
+    os.remove(file_full_path)
+
+
+def msg_kick(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'kick', settings)
+
+
+def msg_kick_yes(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'kick_yes', settings)
+
+
+def msg_kick_no(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'kick_no', settings)
+
 
+def msg_kick_res(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'kick_res', settings)
 
-def save_chat_langs():
-    logger.logger.info('Saving chat\'s langs')
 
-    file_full_path = os.path.join(os.path.dirname(__file__), '..\\..\\' + CHAT_LANG_FILE)
-    with open(file_full_path, 'w') as f:
-        f.write(json.dumps(lang_by_chat))
+def msg_descrb_problem(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'descrb_problem', settings)
 
 
-def msg_kick(chat_id) -> str:
-    return _get_trans_str(chat_id, 'kick')
+def msg_give_contact_info(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'give_contact_info', settings)
 
 
-def msg_kick_yes(chat_id) -> str:
-    return _get_trans_str(chat_id, 'kick_yes')
+def msg_bug_report_send(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'bug_report_send', settings)
 
 
-def msg_kick_no(chat_id) -> str:
-    return _get_trans_str(chat_id, 'kick_no')
+def msg_lang_choose(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'lang_choose', settings)
 
 
-def msg_kick_res(chat_id) -> str:
-    return _get_trans_str(chat_id, 'kick_res')
+def msg_lang_notify(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'lang_notify', settings)
 
 
-def msg_descrb_problem(chat_id) -> str:
-    return _get_trans_str(chat_id, 'descrb_problem')
+def msg_version_info(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'version_info', settings)
 
 
-def msg_give_contact_info(chat_id) -> str:
-    return _get_trans_str(chat_id, 'give_contact_info')
+def msg_settings_info(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'settings_info', settings)
 
 
-def msg_bug_report_send(chat_id) -> str:
-    return _get_trans_str(chat_id, 'bug_report_send')
+def msg_settings_changed(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'settings_changed', settings)
 
 
-def msg_lang_choose(chat_id) -> str:
-    return _get_trans_str(chat_id, 'lang_choose')
+def msg_settings_wrong(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'settings_wrong', settings)
 
 
-def msg_lang_notify(chat_id) -> str:
-    return _get_trans_str(chat_id, 'lang_notify')
+def msg_not_admin(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'not_admin', settings)
 
 
-def msg_version_info(chat_id) -> str:
-    return _get_trans_str(chat_id, 'version_info')
+def msg_stats(chat_id, settings: settingsapi.ChatSettingsStore = None) -> str:
+    return _get_trans_str(chat_id, 'stats', settings)
@@ -0,0 +1,152 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import json
+import math
+import os
+
+from src import logger
+
+CHAT_SETTINGS_FILE = 'chat_settings.json'
+
+DEFAULT_SETTINGS = {
+    'kick_delay': 12 * 3600,
+    'poll_lifetime': 24 * 3600,
+    'quorum': 0,
+    'quorum_percent': 0,
+    'lang': 'en-US'
+}
+
+# Settings that chat admins can change with /set and parsers of their values
+_HOURS_SETTINGS = ('kick_delay', 'poll_lifetime')
+_COUNT_SETTINGS = ('quorum',)
+_PERCENT_SETTINGS = ('quorum_percent',)
+
+# Limits of values that can be set by command
+MAX_HOURS = 366 * 24
+MAX_COUNT = 1000000
+
+
+class ChatSettingsStore:
+    """
+    Per-chat settings. All lookups are served from memory, every change is written to file at once
+
+    Only values that differ from defaults are saved. Resolved settings of every chat are cached, so lookup is one
+    dict access. Cache entry is dropped on every change of this chat
+    """
+
+    def __init__(self, filename: str = CHAT_SETTINGS_FILE, defaults: dict = None):
+        self.filename = filename
+        self.defaults = dict(DEFAULT_SETTINGS if defaults is None else defaults)
+        self._overrides = {}
+        self._resolved = {}
+
+    def load(self) -> None:
+        logger.logger.info('Reading chat\'s settings from ' + self.filename)
+
+        self._overrides = {}
+        self._resolved = {}
+
+        if not os.path.exists(self.filename):
+            logger.logger.info('Chat\'s settings file does not exist. Using defaults everywhere')
+            return
+
+        with open(self.filename, 'r') as f:
+            for chat_id, overrides in json.loads(f.read()).items():
+                self._overrides[int(chat_id)] = overrides
+
+    def save(self) -> None:
+        logger.logger.debug('Saving chat\'s settings')
+
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            f.write(json.dumps(self._overrides))
+        os.replace(tmp_filename, self.filename)
+
+    def get_all(self, chat_id: int) -> dict:
+        """Return all settings of chat. Returned dict is cached and must not be changed"""
+
+        resolved = self._resolved.get(chat_id)
+        if resolved is None:
+            resolved = dict(self.defaults)
+            resolved.update(self._overrides.get(chat_id, {}))
+            self._resolved[chat_id] = resolved
+        return resolved
+
+    def get(self, chat_id: int, key: str):
+        return self.get_all(chat_id)[key]
+
+    def set(self, chat_id: int, key: str, value) -> None:
+        if key not in self.defaults:
+            raise KeyError('Unknown setting ' + key)
+
+        logger.logger.info('Changing ' + key + ' for chat #' + str(chat_id) + ' to ' + str(value))
+
+        overrides = self._overrides.setdefault(chat_id, {})
+        if value == self.defaults[key]:
+            overrides.pop(key, None)
+        else:
+            overrides[key] = value
+        if not overrides:
+            del self._overrides[chat_id]
+
+        self.invalidate(chat_id)
+        self.save()
+
+    def invalidate(self, chat_id: int = None) -> None:
+        """Drop cached settings of chat, or of all chats if chat_id is None"""
+
+        if chat_id is None:
+            self._resolved.clear()
+        else:
+            self._resolved.pop(chat_id, None)
+
+
+def parse_setting(key: str, value: str):
+    """Convert value from /set command to stored value. Raises ValueError or KeyError if it's wrong"""
+
+    if key in _HOURS_SETTINGS:
+        hours = float(value)
+        if not math.isfinite(hours) or not 0 < hours <= MAX_HOURS:
+            raise ValueError('Timeout must be from 0 to ' + str(MAX_HOURS) + ' hours')
+        return int(hours * 3600)
+    if key in _COUNT_SETTINGS:
+        count = int(value)
+        if not 0 <= count <= MAX_COUNT:
+            raise ValueError('Count must be from 0 to ' + str(MAX_COUNT))
+        return count
+    if key in _PERCENT_SETTINGS:
+        percent = int(value)
+        if not 0 <= percent <= 100:
+            raise ValueError('Percent must be from 0 to 100')
+        return percent
+    raise KeyError('Setting ' + key + ' can not be changed by command')
+
+
+def format_settings(settings: dict) -> str:
+    lines = []
+    for key, value in settings.items():
+        if key in _HOURS_SETTINGS:
+            value = '{:g}h'.format(value / 3600)
+        elif key in _PERCENT_SETTINGS:
+            value = str(value) + '%'
+        lines += [key + ' = ' + str(value)]
+    return '\n'.join(lines)
+
+
+store = ChatSettingsStore()
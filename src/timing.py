@@ -0,0 +1,48 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import time
+
+from src import logger
+
+
+class StartupTimer:
+    """Measures how long every startup phase takes"""
+
+    def __init__(self):
+        self.phases = []
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def mark(self, phase: str) -> None:
+        """Finish current phase and name it"""
+
+        now = time.perf_counter()
+        self.phases += [(phase, now - self._last)]
+        self._last = now
+
+    def report(self) -> str:
+        total = self._last - self._started
+        lines = ['Startup timing:']
+        for phase, duration in self.phases:
+            lines += ['  {:<24} {:8.1f} ms'.format(phase, duration * 1000)]
+        lines += ['  {:<24} {:8.1f} ms'.format('total', total * 1000)]
+        return '\n'.join(lines)
+
+    def log_report(self) -> None:
+        logger.logger.info('\n' + self.report())
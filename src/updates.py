@@ -0,0 +1,225 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import json
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+
+        loads = ujson.loads
+    except ImportError:
+        loads = json.loads
+
+
+class User:
+    """Telegram User. Fields are read from raw dict only when they are accessed"""
+
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw: dict):
+        self._raw = raw
+
+    @property
+    def id(self) -> int:
+        return self._raw['id']
+
+    @property
+    def first_name(self) -> str:
+        return self._raw.get('first_name', '')
+
+    @property
+    def last_name(self) -> str:
+        return self._raw.get('last_name', '')
+
+    @property
+    def username(self) -> str:
+        return self._raw.get('username', '')
+
+    @property
+    def is_bot(self) -> bool:
+        return self._raw.get('is_bot', False)
+
+    @property
+    def full_name(self) -> str:
+        return (self.first_name + ' ' + self.last_name).strip()
+
+
+class Chat:
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw: dict):
+        self._raw = raw
+
+    @property
+    def id(self) -> int:
+        return self._raw['id']
+
+    @property
+    def type(self) -> str:
+        return self._raw.get('type', '')
+
+
+class Message:
+    __slots__ = ('_raw', '_chat', '_from', '_reply')
+
+    def __init__(self, raw: dict):
+        self._raw = raw
+        self._chat = None
+        self._from = None
+        self._reply = None
+
+    @property
+    def message_id(self) -> int:
+        return self._raw['message_id']
+
+    @property
+    def date(self) -> int:
+        return self._raw.get('date', 0)
+
+    @property
+    def text(self) -> str:
+        return self._raw.get('text', '')
+
+    @property
+    def chat(self) -> Chat:
+        if self._chat is None:
+            self._chat = Chat(self._raw['chat'])
+        return self._chat
+
+    @property
+    def from_user(self) -> User:
+        """Sender of message, None for messages in channels"""
+
+        if self._from is None and 'from' in self._raw:
+            self._from = User(self._raw['from'])
+        return self._from
+
+    @property
+    def changes_members(self) -> bool:
+        """True if this is service message about users that joined or left chat"""
+
+        return 'new_chat_members' in self._raw or 'left_chat_member' in self._raw
+
+    @property
+    def reply_to_message(self):
+        """Message that this message replies to, or None"""
+
+        if self._reply is None and 'reply_to_message' in self._raw:
+            self._reply = Message(self._raw['reply_to_message'])
+        return self._reply
+
+
+class CallbackQuery:
+    __slots__ = ('_raw', '_message')
+
+    def __init__(self, raw: dict):
+        self._raw = raw
+        self._message = None
+
+    @property
+    def data(self) -> str:
+        return self._raw.get('data', '')
+
+    @property
+    def message(self) -> Message:
+        if self._message is None and 'message' in self._raw:
+            self._message = Message(self._raw['message'])
+        return self._message
+
+
+class ChatMemberUpdated:
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw: dict):
+        self._raw = raw
+
+    @property
+    def chat(self) -> Chat:
+        return Chat(self._raw['chat'])
+
+
+class Poll:
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw: dict):
+        self._raw = raw
+
+    @property
+    def id(self) -> int:
+        return int(self._raw['id'])
+
+    @property
+    def options(self) -> list:
+        return self._raw['options']
+
+
+class Update:
+    """
+    Telegram Update
+
+    Every optional part of update is None if it is absent, so handlers can check it instead of catching KeyError
+    """
+
+    __slots__ = ('raw', '_message', '_callback_query', '_poll')
+
+    # Update types that bot asks for in getUpdates
+    ALLOWED = ('message', 'callback_query', 'poll', 'chat_member', 'my_chat_member')
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        self._message = None
+        self._callback_query = None
+        self._poll = None
+
+    @property
+    def update_id(self) -> int:
+        return self.raw['update_id']
+
+    @property
+    def message(self) -> Message:
+        if self._message is None and 'message' in self.raw:
+            self._message = Message(self.raw['message'])
+        return self._message
+
+    @property
+    def callback_query(self) -> CallbackQuery:
+        if self._callback_query is None and 'callback_query' in self.raw:
+            self._callback_query = CallbackQuery(self.raw['callback_query'])
+        return self._callback_query
+
+    @property
+    def poll(self) -> Poll:
+        if self._poll is None and 'poll' in self.raw:
+            self._poll = Poll(self.raw['poll'])
+        return self._poll
+
+    @property
+    def chat_member(self) -> ChatMemberUpdated:
+        """Change of status of chat member or of bot itself, or None"""
+
+        raw = self.raw.get('chat_member') or self.raw.get('my_chat_member')
+        return ChatMemberUpdated(raw) if raw is not None else None
+
+
+def parse_updates(raw_updates: list) -> list:
+    return [Update(raw) for raw in raw_updates]
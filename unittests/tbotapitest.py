@@ -21,23 +21,7 @@ import json
 
 from src import logger
 from src.botapi import TelegramBotAPI, TelegramBotException
-
-
-class LoggerFake:
-    def info(self, *args, **kwargs):
-        pass
-
-    def debug(self, *args, **kwargs):
-        pass
-
-    def trace(self, *args, **kwargs):
-        pass
-
-    def error(self, *args, **kwargs):
-        pass
-
-    def warning(self, *args, **kwargs):
-        pass
+from unittests.fakes import LoggerFake
 
 
 class TelegramBotAPITests(unittest.TestCase):
@@ -74,9 +58,9 @@ class TelegramBotAPITests(unittest.TestCase):
     def test_get_poll_options(self):
         with open('pollid.tmp', 'r') as f:
             poll_id = int(f.read())
-        options = self.botapi.get_poll_result(poll_id)
-        self.assertEqual(0, options[0]['voter_count'])
-        self.assertEqual(0, options[1]['voter_count'])
+        poll = self.botapi.get_poll_result(poll_id)
+        self.assertEqual(0, poll.yes)
+        self.assertEqual(0, poll.no)
 
     def test_get_new_updates(self):
         self.botapi.get_new_updates()
@@ -89,9 +73,9 @@ class TelegramBotAPITests(unittest.TestCase):
         with open('pollid.tmp', 'r') as f:
             poll_id = int(f.read())
 
-        options = self.botapi.get_poll_result(poll_id)
-        self.assertEqual(0, options[0]['voter_count'])
-        self.assertEqual(1, options[1]['voter_count'])
+        poll = self.botapi.get_poll_result(poll_id)
+        self.assertEqual(0, poll.yes)
+        self.assertEqual(1, poll.no)
 
     def test_send_message_to_wrong_chat(self):
         self.assertRaises(TelegramBotException, self.botapi.send_message, -1, "Test")
@@ -0,0 +1,93 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import unittest
+
+from src import logger
+from src.chatcache import ChatInfoCache
+from src.updates import Update
+from unittests.fakes import LoggerFake
+
+
+class ApiFake:
+    def __init__(self):
+        self.calls = 0
+
+    def get_chat_administrators(self, chat_id: int) -> list:
+        self.calls += 1
+        return [{'user': {'id': 1}, 'status': 'creator'},
+                {'user': {'id': 2}, 'status': 'administrator', 'can_restrict_members': True},
+                {'user': {'id': 3}, 'status': 'administrator', 'can_restrict_members': False}]
+
+    def get_chat_members_count(self, chat_id: int) -> int:
+        self.calls += 1
+        return 10
+
+
+class ChatInfoCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.now = 1000
+        self.api = ApiFake()
+        self.cache = ChatInfoCache(self.api, 60, lambda: self.now)
+
+    def test_ttl(self):
+        self.assertEqual(frozenset([1, 2, 3]), self.cache.get_administrators(-100))
+        self.assertEqual(10, self.cache.get_members_count(-100))
+        self.now += 59
+        self.cache.get_administrators(-100)
+        self.cache.get_members_count(-100)
+        self.assertEqual(2, self.api.calls)
+        self.now += 1
+        self.cache.get_administrators(-100)
+        self.assertEqual(3, self.api.calls)
+
+    def test_can_ban(self):
+        self.assertTrue(self.cache.can_ban(-100, 1))
+        self.assertTrue(self.cache.can_ban(-100, 2))
+        self.assertFalse(self.cache.can_ban(-100, 3))
+        self.assertFalse(self.cache.can_ban(-100, 4))
+        self.assertEqual(1, self.api.calls)
+
+    def test_chat_member_update_invalidates(self):
+        self.cache.get_administrators(-100)
+        self.cache.get_administrators(-200)
+        self.cache.process_updates([Update({'update_id': 1, 'chat_member': {'chat': {'id': -100}}})])
+        self.cache.get_administrators(-100)
+        self.cache.get_administrators(-200)
+        self.assertEqual(3, self.api.calls)
+
+    def test_join_and_leave_invalidate(self):
+        chat = {'id': -100, 'type': 'group'}
+        for message in ({'new_chat_members': [{'id': 5, 'first_name': 'A'}]}, {'left_chat_member': {'id': 5, 'first_name': 'A'}}):
+            self.cache.get_members_count(-100)
+            message.update({'message_id': 1, 'date': 0, 'chat': chat})
+            self.cache.process_updates([Update({'update_id': 1, 'message': message})])
+        self.cache.get_members_count(-100)
+        self.assertEqual(3, self.api.calls)
+
+        self.cache.process_updates([Update({'update_id': 2, 'message': {'message_id': 2, 'date': 0, 'chat': chat, 'text': 'hi'}})])
+        self.cache.get_members_count(-100)
+        self.assertEqual(3, self.api.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
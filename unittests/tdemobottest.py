@@ -0,0 +1,164 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import os
+import tempfile
+import unittest
+
+from src import logger
+from src.botapi import TelegramBotException, TelegramUnavailableException
+from src.clock import VirtualClock
+from src.demobot import DemoBot
+from src.history import FAILED
+from src.ingest import BOOKKEEPING, COMMANDS
+from src.polls import Poll, PollStore
+from src.simulation import ADMIN_ID, BOT_USERNAME, FakeTelegram
+from src.updates import Update
+from unittests.fakes import LoggerFake
+
+
+class DemoBotTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.clock = VirtualClock(1600000000)
+        self.telegram = FakeTelegram(self.clock)
+        self.bot = DemoBot({'token': 'test', 'bot_username': BOT_USERNAME, 'data_dir': self.tmp_dir.name},
+                           session=self.telegram, clock=self.clock)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def add_message(self, text: str, chat_id: int = -100, from_id: int = 5) -> None:
+        self.telegram.add_event(self.clock.time(), {'message': {
+            'message_id': 1, 'date': int(self.clock.time()), 'text': text,
+            'chat': {'id': chat_id, 'type': 'group'}, 'from': {'id': from_id, 'first_name': 'User'}
+        }})
+
+    def test_callback_query_is_handled_before_flood(self):
+        for i in range(500):
+            self.add_message('message ' + str(i))
+        self.telegram.add_event(self.clock.time(), {'callback_query': {
+            'id': '1', 'data': 'lang en-US', 'from': {'id': 5, 'first_name': 'User'}
+        }})
+
+        batches = []
+        self.bot.handle_updates = batches.append
+        self.bot.check_kick_candidates()
+
+        self.assertIsNotNone(batches[0][0].callback_query)
+        self.assertEqual(100, len(batches[0]))
+
+    def test_classify(self):
+        chat = {'id': -100, 'type': 'group'}
+        user = {'id': 5, 'first_name': 'User'}
+
+        def message(text: str, **extra) -> Update:
+            raw = {'message_id': 1, 'date': 0, 'chat': chat, 'from': user, 'text': text}
+            raw.update(extra)
+            return Update({'update_id': 1, 'message': raw})
+
+        self.assertEqual(COMMANDS, self.bot.classify(Update({'update_id': 1, 'chat_member': {'chat': chat}})))
+        self.assertEqual(COMMANDS, self.bot.classify(Update({'update_id': 1, 'my_chat_member': {'chat': chat}})))
+        self.assertEqual(COMMANDS, self.bot.classify(message('', new_chat_members=[user])))
+        self.assertEqual(BOOKKEEPING, self.bot.classify(message('problem')))
+        # Answer fetched together with /report before dialog was started
+        self.assertEqual(COMMANDS, self.bot.classify(message('/report' + BOT_USERNAME)))
+        self.assertEqual(COMMANDS, self.bot.classify(message('problem')))
+
+    def test_can_be_kicked(self):
+        self.assertTrue(self.bot.can_be_kicked(-100, 7, 'john'))
+        self.assertTrue(self.bot.can_be_kicked(-100, 8, None))
+        self.assertFalse(self.bot.can_be_kicked(5, 7, 'john'))
+        self.assertFalse(self.bot.can_be_kicked(-100, ADMIN_ID, 'admin'))
+        self.assertFalse(self.bot.can_be_kicked(-100, 9, BOT_USERNAME[1:].upper()))
+
+    def test_can_not_kick_without_ban_rights(self):
+        self.telegram.bot_can_ban = False
+        self.assertFalse(self.bot.can_be_kicked(-100, 7, 'john'))
+
+    def test_quorum_without_members_count(self):
+        def not_member(chat_id):
+            raise TelegramBotException('Bad Request: chat not found')
+
+        self.bot.chat_info.get_members_count = not_member
+        settings = {'quorum': 2, 'quorum_percent': 50}
+        self.assertEqual(2, self.bot.get_quorum(-100, settings))
+
+    def test_offset_is_committed_with_polls(self):
+        self.telegram.add_mention(self.clock.time(), -100, 7, 5)
+        self.bot.check_kick_candidates()
+        self.assertEqual(1, len(self.bot.api.polls))
+        self.assertEqual(0, self.bot.api.committed_offset)
+
+        self.bot.save()
+        self.assertEqual(2, self.bot.api.committed_offset)
+        polls = PollStore(os.path.join(self.tmp_dir.name, 'polls.json'))
+        polls.load()
+        self.assertEqual(1, len(polls))
+
+    def test_catch_up_stops(self):
+        for i in range(300):
+            self.add_message('/unknown')
+        self.bot.catch_up(lambda: True)
+        self.assertEqual(200, len(self.bot.queue))
+
+    def test_failed_kick_is_tried_again(self):
+        date = int(self.clock.time())
+        self.bot.api.polls.add(Poll(1, -100, date, user_id=7, name='John'))
+        self.bot.api.polls.update_votes(1, [{'text': 'Yes', 'voter_count': 3}, {'text': 'No', 'voter_count': 1}])
+        self.clock.advance(12 * 3600)
+
+        kick_chat_member = self.bot.api.kick_chat_member
+
+        def unavailable(*args):
+            raise TelegramUnavailableException('Api is unavailable', 10)
+
+        self.bot.api.kick_chat_member = unavailable
+        self.assertRaises(TelegramUnavailableException, self.bot.check_old_polls)
+        self.assertIn(1, self.bot.api.polls)
+        self.assertEqual(0, len(self.bot.history))
+
+        self.bot.api.kick_chat_member = kick_chat_member
+        self.bot.check_old_polls()
+        self.assertNotIn(1, self.bot.api.polls)
+        self.assertEqual(1, self.telegram.kicks)
+        self.assertEqual(1, len(self.bot.history))
+
+    def test_refused_kick_closes_poll(self):
+        date = int(self.clock.time())
+        self.bot.api.polls.add(Poll(1, -100, date, user_id=7, name='John'))
+        self.bot.api.polls.update_votes(1, [{'text': 'Yes', 'voter_count': 3}, {'text': 'No', 'voter_count': 1}])
+        self.clock.advance(12 * 3600)
+
+        def not_enough_rights(*args):
+            raise TelegramBotException('Bad Request: not enough rights to restrict/ban chat member')
+
+        self.bot.api.kick_chat_member = not_enough_rights
+        self.bot.check_old_polls()
+        self.assertNotIn(1, self.bot.api.polls)
+        self.assertIsNone(self.bot.api.polls.find_by_target(-100, 7))
+        self.assertEqual([FAILED], list(self.bot.history.columns['outcome']))
+        self.assertEqual(0, self.bot.history.query()['kicked'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import os
+import sys
+import tempfile
+import unittest
+
+from src import history, logger
+from src.history import CLOSED, KICKED, VoteHistory
+from unittests.fakes import LoggerFake
+
+
+class VoteHistoryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.history = VoteHistory(self.tmp_dir.name)
+        self.history.append(-100, 1, 1000, 4600, 5, 1, KICKED)
+        self.history.append(-100, 2, 2000, 9200, 1, 3, CLOSED)
+        self.history.append(-200, 3, 3000, 6600, 4, 0, KICKED)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_query(self, query):
+        stats = query(-100, None, None)
+        self.assertEqual(2, stats['polls'])
+        self.assertEqual(1, stats['kicked'])
+        self.assertEqual(5, stats['avg_turnout'])
+        self.assertEqual(5400, stats['avg_decision_time'])
+
+        stats = query(None, 5000, 7000)
+        self.assertEqual(1, stats['polls'])
+        self.assertEqual(1.0, stats['kick_rate'])
+
+        self.assertEqual(0, query(-300, None, None)['polls'])
+
+    def test_query_python(self):
+        self.check_query(self.history._query_python)
+
+    @unittest.skipIf(history.import_numpy() is None, 'numpy is not installed')
+    def test_query_numpy(self):
+        self.check_query(self.history._query_numpy)
+
+    def test_load(self):
+        self.history.flush()
+        loaded = VoteHistory(self.tmp_dir.name)
+        loaded.load()
+        self.assertEqual(3, len(loaded))
+        self.assertEqual(3, loaded.query()['polls'])
+
+    def test_load_cuts_partly_written_row(self):
+        self.history.flush()
+        with open(os.path.join(self.tmp_dir.name, 'chat_id.col'), 'ab') as f:
+            f.write(b'\x01\x02\x03')
+        with open(os.path.join(self.tmp_dir.name, 'target.col'), 'ab') as f:
+            f.write((9).to_bytes(8, sys.byteorder, signed=True))
+
+        loaded = VoteHistory(self.tmp_dir.name)
+        loaded.load()
+        self.assertEqual(3, len(loaded))
+
+        loaded.append(-300, 4, 4000, 5000, 1, 0, CLOSED)
+        loaded.flush()
+        reloaded = VoteHistory(self.tmp_dir.name)
+        reloaded.load()
+        self.assertEqual(4, len(reloaded))
+        self.assertEqual(-300, reloaded.columns['chat_id'][3])
+        self.assertEqual(4, reloaded.columns['target'][3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import unittest
+
+from src import logger
+from src.ingest import BOOKKEEPING, COMMANDS, INTERACTIVE, UpdateQueue
+from src.updates import Update
+from unittests.fakes import LoggerFake
+
+
+class UpdateQueueTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def test_priority_order(self):
+        queue = UpdateQueue()
+        queue.put(Update({'update_id': 1}), BOOKKEEPING)
+        queue.put(Update({'update_id': 2}), COMMANDS)
+        queue.put(Update({'update_id': 3}), INTERACTIVE)
+        queue.put(Update({'update_id': 4}), COMMANDS)
+
+        self.assertEqual(1, queue.min_pending_id())
+        self.assertEqual([3, 2], [u.update_id for u in queue.pop_batch(2)])
+        self.assertEqual(1, queue.min_pending_id())
+        self.assertEqual([4, 1], [u.update_id for u in queue.pop_batch(10)])
+        self.assertIsNone(queue.min_pending_id())
+
+    def test_backpressure(self):
+        queue = UpdateQueue(capacity=4)
+        for i in range(3):
+            queue.put(Update({'update_id': i}), COMMANDS)
+        self.assertEqual(1, queue.free_space())
+
+    def test_bookkeeping_is_shed(self):
+        queue = UpdateQueue(capacity=4, bookkeeping_capacity=2)
+        for i in range(3):
+            queue.put(Update({'update_id': i}), BOOKKEEPING)
+        self.assertEqual(1, queue.shed)
+        self.assertEqual(1, queue.min_pending_id())
+
+        for i in range(3, 6):
+            queue.put(Update({'update_id': i}), COMMANDS)
+        queue.put(Update({'update_id': 6}), BOOKKEEPING)
+        self.assertEqual(2, queue.shed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import os
+import tempfile
+import unittest
+
+from src import logger
+from src.cooldowns import Cooldowns
+from src.polls import Poll, PollStore
+from unittests.fakes import LoggerFake
+
+
+class PollStoreTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'polls.json')
+        self.store = PollStore(self.filename, retention=60)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_update_votes(self):
+        self.store.add(Poll(1, -100, 1000))
+        self.store.update_votes(1, [{'text': 'Yes', 'voter_count': 3}, {'text': 'No', 'voter_count': 1}])
+        self.assertEqual(3, self.store.get(1).yes)
+        self.assertEqual(1, self.store.get(1).no)
+
+    def test_unknown_poll_is_ignored(self):
+        self.store.update_votes(2, [{'text': 'Yes', 'voter_count': 3}])
+        self.assertEqual(0, len(self.store))
+
+    def test_finished_poll_is_evicted(self):
+        self.store.add(Poll(1, -100, 1000))
+        self.store.close(1, 2000)
+        self.assertEqual(0, len(self.store))
+        self.store.evict_finished(2030)
+        self.assertEqual(1, self.store.get(1).poll_id)
+        self.store.evict_finished(2060)
+        self.assertRaises(KeyError, self.store.get, 1)
+
+    def test_save_only_open_polls(self):
+        self.store.add(Poll(1, -100, 1000, user_id=5, name='John'))
+        self.store.add(Poll(2, -100, 1000))
+        self.store.close(2, 2000)
+        self.store.save()
+
+        loaded = PollStore(self.filename)
+        loaded.load()
+        self.assertEqual(1, len(loaded))
+        self.assertEqual('John', loaded.get(1).name)
+        self.assertEqual(5, loaded.get(1).user_id)
+
+    def test_find_by_target(self):
+        self.store.add(Poll(1, -100, 1000))
+        self.store.set_target(1, 7, 'John')
+        self.assertEqual(1, self.store.find_by_target(-100, 7).poll_id)
+        self.assertIsNone(self.store.find_by_target(-200, 7))
+        self.store.close(1, 2000)
+        self.assertIsNone(self.store.find_by_target(-100, 7))
+
+    def test_next_due(self):
+        self.store.add(Poll(1, -100, 1000))
+        self.assertEqual(1, self.store.next_due(1000).poll_id)
+        self.assertIsNone(self.store.next_due(1000))
+        self.store.schedule(1, 2000)
+        self.assertIsNone(self.store.next_due(1500))
+        self.store.update_votes(1, [{'text': 'Yes', 'voter_count': 1}])
+        self.assertEqual(1, self.store.next_due(1500).poll_id)
+        # Entry at 2000 was replaced by earlier one
+        self.assertIsNone(self.store.next_due(2000))
+
+
+class CooldownsTests(unittest.TestCase):
+    def test_cooldown_ends(self):
+        now = [1000]
+        cooldowns = Cooldowns(60, lambda: now[0])
+        cooldowns.start('key')
+        self.assertTrue(cooldowns.is_active('key'))
+        now[0] += 60
+        self.assertFalse(cooldowns.is_active('key'))
+        self.assertEqual(0, len(cooldowns))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import tempfile
+import unittest
+
+import requests
+
+from src import logger
+from src.botapi import TelegramBotAPI, TelegramBotException, TelegramUnavailableException
+from src.retry import CircuitBreaker, RetryPolicy
+from unittests.fakes import LoggerFake
+
+
+class RetryPolicyTests(unittest.TestCase):
+    def test_delay_is_capped(self):
+        policy = RetryPolicy(base_delay=1, max_delay=10)
+        for attempt in range(2000):
+            self.assertLessEqual(policy.delay(attempt), 10)
+
+    def test_not_idempotent_retried_only_when_safe(self):
+        policy = RetryPolicy(max_attempts=3, idempotent=False)
+        self.assertTrue(policy.can_retry(1, True))
+        self.assertFalse(policy.can_retry(1, False))
+        self.assertFalse(policy.can_retry(3, True))
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.now = 1000
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: self.now)
+
+    def test_opens_after_failures(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(10, self.breaker.time_until_retry())
+
+    def test_probe_closes_breaker(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now += 10
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_doubles_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now += 10
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(20, self.breaker.time_until_retry())
+
+
+class BrokenResponseSession:
+    def __init__(self, error: Exception = None, status_code: int = 200, content: bytes = b''):
+        self.error = error
+        self.status_code = status_code
+        self.content = content
+
+    def get(self, *args, **kwargs):
+        if self.error is not None:
+            raise self.error
+        return self
+
+
+class ApiBreakerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.now = 1000
+        self.api = TelegramBotAPI('token', False, {'bot_username': '@test_bot'}, self.tmp_dir.name)
+        self.api.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: self.now)
+        self.api.sleep = lambda seconds: None
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_probe_failure_reopens_breaker(self, session):
+        self.api.session = session
+        self.assertRaises(TelegramUnavailableException, self.api.get_chat_members_count, -100)
+        self.now += 10
+        self.assertRaises(TelegramBotException, self.api.get_chat_members_count, -100)
+        self.assertEqual(CircuitBreaker.OPEN, self.api.breaker.state)
+        self.now += 20
+        self.assertTrue(self.api.breaker.allow_request())
+
+    def test_unexpected_request_error_is_failure(self):
+        self.check_probe_failure_reopens_breaker(BrokenResponseSession(requests.exceptions.ChunkedEncodingError()))
+
+    def test_too_many_requests_without_json(self):
+        self.check_probe_failure_reopens_breaker(BrokenResponseSession(status_code=429, content=b'<html>Too many requests</html>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import unittest
+
+from src import logger
+from src.runtime import BotRuntime, load_bot_configs
+from src.scheduler import Scheduler
+from unittests.fakes import LoggerFake
+
+
+class LoadBotConfigsTests(unittest.TestCase):
+    def test_single_bot(self):
+        self.assertEqual([{'token': 'a', 'bot_username': '@a'}], load_bot_configs({'token': 'a', 'bot_username': '@a'}))
+
+    def test_bots_override_top_level(self):
+        configs = load_bot_configs({'token': 'a', 'bot_username': '@a', 'idle_sleep': 1, 'bots': [
+            {'data_dir': 'data/a'},
+            {'token': 'b', 'bot_username': '@b', 'data_dir': 'data/b'}
+        ]})
+        self.assertEqual(['@a', '@b'], [c['bot_username'] for c in configs])
+        self.assertEqual(['a', 'b'], [c['token'] for c in configs])
+        self.assertEqual([1, 1], [c['idle_sleep'] for c in configs])
+        self.assertNotIn('bots', configs[0])
+
+    def test_same_data_dir(self):
+        config = {'token': 'a', 'bot_username': '@a', 'data_dir': 'data', 'bots': [
+            {},
+            {'token': 'b', 'bot_username': '@b', 'data_dir': 'data/'}
+        ]}
+        self.assertRaises(ValueError, load_bot_configs, config)
+
+
+class BotFake:
+    def __init__(self, name: str, fails: bool):
+        self.name = name
+        self.fails = fails
+        self.queue = [1, 2]
+        self.saved = False
+
+    def process_updates(self):
+        self.queue.pop()
+        if self.fails:
+            raise RuntimeError('Processing failed')
+
+    def save(self):
+        self.saved = True
+
+
+class FlushTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def test_every_bot_is_saved(self):
+        # Runtime without real bots
+        runtime = BotRuntime.__new__(BotRuntime)
+        runtime.error_handler = None
+        runtime.bots = [BotFake('@a', True), BotFake('@b', False)]
+        self.assertRaises(RuntimeError, runtime.flush)
+        self.assertEqual([True, True], [bot.saved for bot in runtime.bots])
+
+
+class SchedulerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.now = 1000
+        self.scheduler = Scheduler(lambda: self.now)
+
+    def test_tasks_run_in_order_when_due(self):
+        runs = []
+        self.scheduler.call_later(10, lambda: runs.append('later'))
+        self.scheduler.call_later(5, lambda: runs.append('sooner'))
+        self.assertEqual(5, self.scheduler.time_until_next())
+
+        self.assertEqual(0, self.scheduler.run_pending())
+        self.now += 10
+        self.assertEqual(2, self.scheduler.run_pending())
+        self.assertEqual(['sooner', 'later'], runs)
+        self.assertIsNone(self.scheduler.time_until_next())
+
+    def test_interval_task_is_rescheduled(self):
+        runs = []
+        self.scheduler.call_every(5, lambda: runs.append(self.now))
+        self.now += 5
+        self.scheduler.run_pending()
+        # Missed runs are not repeated
+        self.now += 12
+        self.scheduler.run_pending()
+        self.assertEqual([1005, 1017], runs)
+        self.assertEqual(5, self.scheduler.time_until_next())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import os
+import tempfile
+import unittest
+
+from src import logger
+from src.syssettings.settingsapi import ChatSettingsStore, parse_setting
+from unittests.fakes import LoggerFake
+
+
+class ChatSettingsStoreTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logger.logger = LoggerFake()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'chat_settings.json')
+        self.store = ChatSettingsStore(self.filename)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_defaults(self):
+        self.assertEqual(12 * 3600, self.store.get(-100, 'kick_delay'))
+        self.assertEqual('en-US', self.store.get(-100, 'lang'))
+
+    def test_set_is_written_through(self):
+        self.store.get(-100, 'quorum')
+        self.store.set(-100, 'quorum', 5)
+        self.assertEqual(5, self.store.get(-100, 'quorum'))
+        self.assertEqual(0, self.store.get(-200, 'quorum'))
+
+        loaded = ChatSettingsStore(self.filename)
+        loaded.load()
+        self.assertEqual(5, loaded.get(-100, 'quorum'))
+
+    def test_unknown_setting(self):
+        self.assertRaises(KeyError, self.store.set, -100, 'unknown', 1)
+
+    def test_parse_setting(self):
+        self.assertEqual(6 * 3600, parse_setting('kick_delay', '6'))
+        self.assertEqual(3, parse_setting('quorum', '3'))
+        self.assertRaises(ValueError, parse_setting, 'poll_lifetime', '-1')
+        self.assertRaises(KeyError, parse_setting, 'lang', 'en-US')
+        for value in ('inf', '1e400', 'nan', '100000'):
+            self.assertRaises(ValueError, parse_setting, 'kick_delay', value)
+        self.assertRaises(ValueError, parse_setting, 'quorum', '1' + '0' * 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
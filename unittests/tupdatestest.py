@@ -0,0 +1,48 @@
+#    This file is part of DemocraticBot.
+#    https://github.com/Nekit10/DemoBot
+#
+#    DemocraticBot is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    DemocraticBot is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with DemocraticBot.  If not, see <https://www.gnu.org/licenses/>.
+#
+#    Copyright (c) 2019 Nikita Serba
+
+import unittest
+
+from src.updates import Update, loads, parse_updates
+
+
+class UpdateTests(unittest.TestCase):
+    def test_message_without_optional_fields(self):
+        update = Update({'update_id': 1, 'message': {'message_id': 2, 'chat': {'id': -100}, 'from': {'id': 3, 'first_name': 'John'}}})
+        self.assertEqual('', update.message.text)
+        self.assertEqual('John', update.message.from_user.full_name)
+        self.assertIsNone(update.message.reply_to_message)
+        self.assertIsNone(update.callback_query)
+        self.assertIsNone(update.poll)
+
+    def test_reply(self):
+        update = Update({'update_id': 1, 'message': {'message_id': 2, 'chat': {'id': -100}, 'text': '@bot',
+                                                     'reply_to_message': {'message_id': 1, 'chat': {'id': -100},
+                                                                          'from': {'id': 7, 'first_name': 'A', 'last_name': 'B'}}}})
+        self.assertEqual(7, update.message.reply_to_message.from_user.id)
+        self.assertEqual('A B', update.message.reply_to_message.from_user.full_name)
+
+    def test_parse_updates(self):
+        updates = parse_updates(loads(b'{"ok": true, "result": [{"update_id": 5, "poll": {"id": "10", "options": []}}]}')['result'])
+        self.assertEqual(5, updates[0].update_id)
+        self.assertEqual(10, updates[0].poll.id)
+        self.assertIsNone(updates[0].message)
+
+
+if __name__ == '__main__':
+    unittest.main()